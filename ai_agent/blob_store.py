@@ -0,0 +1,132 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+# Content-addressed image storage; Vercel only allows writes under /tmp
+BLOB_STORE_DIR = os.getenv("BLOB_STORE_DIR", os.path.join(tempfile.gettempdir(), "ai-photos-blobs"))
+BLOB_STORE_MAX_BYTES = int(os.getenv("BLOB_STORE_MAX_BYTES", str(4 * 1024 * 1024 * 1024)))
+# Trimming frees space down to this fraction of the cap, so it runs rarely
+TRIM_LOW_WATER = 0.9
+
+class BlobStore:
+    """Stores each distinct payload once on disk under its SHA-256 hex digest.
+
+    Blobs are laid out as ``<dir>/<first two hex chars>/<digest>`` and
+    written atomically, so a path returned by ``path`` can be handed
+    straight to ``FileResponse``. When the store grows past ``max_bytes``
+    the least recently written or read blobs are removed until it is back
+    under ``TRIM_LOW_WATER`` of the cap. Recency is tracked in memory, so
+    trimming never walks the directory; the index is built on the first
+    write or size query, so processes that only read blobs (CPU pool
+    workers) never walk it either.
+    """
+    def __init__(self, directory: str = BLOB_STORE_DIR, max_bytes: int = BLOB_STORE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.dedup_hits = 0
+        self._lock = threading.Lock()
+        self._index: "Optional[OrderedDict[str, int]]" = None
+        self._bytes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _ensure_index(self) -> None:
+        """Build the recency index from the files on disk, oldest first; call with the lock held"""
+        if self._index is None:
+            entries = sorted(self._walk(), key=lambda entry: entry[2])
+            self._index = OrderedDict((path, size) for path, size, _ in entries)
+            self._bytes = sum(self._index.values())
+
+    @property
+    def current_bytes(self) -> int:
+        with self._lock:
+            self._ensure_index()
+            return self._bytes
+
+    def _walk(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def path(self, digest: str) -> str:
+        digest = "".join(c for c in digest.lower() if c in "0123456789abcdef")
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def put(self, data: bytes) -> str:
+        """Store ``data`` if it is not already present and return its digest"""
+        digest = hashlib.sha256(data).hexdigest()
+        self.put_named(digest, data)
+        return digest
+
+    def put_named(self, name: str, data: bytes) -> None:
+        """Store ``data`` under an explicit hex ``name`` (e.g. a hash of a cache key)"""
+        path = self.path(name)
+        with self._lock:
+            self._ensure_index()
+            if os.path.exists(path):
+                os.utime(path)
+                self._mark_used(path)
+                self.dedup_hits += 1
+                return
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self._index[path] = len(data)
+            self._bytes += len(data)
+            self._trim()
+
+    def _mark_used(self, path: str) -> None:
+        if self._index is not None and path in self._index:
+            self._index.move_to_end(path)
+
+    def get(self, digest: str) -> Optional[bytes]:
+        try:
+            with open(self.path(digest), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def exists(self, digest: str) -> bool:
+        return bool(digest) and os.path.exists(self.path(digest))
+
+    def touch(self, digest: str) -> None:
+        """Mark a blob as recently used so trimming keeps it"""
+        path = self.path(digest)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return
+        with self._lock:
+            self._mark_used(path)
+
+    def _trim(self) -> None:
+        if self._bytes <= self.max_bytes:
+            return
+        low_water = self.max_bytes * TRIM_LOW_WATER
+        while self._bytes > low_water and self._index:
+            path, size = self._index.popitem(last=False)
+            self._bytes -= size
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "dedup_hits": self.dedup_hits,
+        }
+
+blob_store = BlobStore()
@@ -0,0 +1,157 @@
+import asyncio
+import itertools
+import multiprocessing
+import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Any, Callable, Hashable, List, Optional
+
+# Worker processes for CPU-bound PIL work; 0 runs jobs on a thread instead
+CPU_POOL_WORKERS = int(os.getenv("CPU_POOL_WORKERS", str(os.cpu_count() or 1)))
+# Jobs allowed in flight per worker before callers wait for a slot
+CPU_POOL_MAX_PENDING = int(os.getenv("CPU_POOL_MAX_PENDING", "4"))
+CPU_POOL_START_METHOD = os.getenv("CPU_POOL_START_METHOD", "spawn")
+# Byte arguments at least this large are handed over through shared memory
+CPU_POOL_SHM_THRESHOLD = int(os.getenv("CPU_POOL_SHM_THRESHOLD", str(256 * 1024)))
+
+class SharedBytes:
+    """Picklable reference to bytes placed in a shared memory segment"""
+    def __init__(self, name: str, size: int):
+        self.name = name
+        self.size = size
+
+    def read(self) -> bytes:
+        shm = shared_memory.SharedMemory(name=self.name)
+        try:
+            return bytes(shm.buf[:self.size])
+        finally:
+            shm.close()
+
+def _share(value: Any, segments: List[shared_memory.SharedMemory]) -> Any:
+    if isinstance(value, (bytes, bytearray)) and len(value) >= CPU_POOL_SHM_THRESHOLD:
+        shm = shared_memory.SharedMemory(create=True, size=len(value))
+        shm.buf[:len(value)] = value
+        segments.append(shm)
+        return SharedBytes(shm.name, len(value))
+    return value
+
+def _resolve(value: Any) -> Any:
+    return value.read() if isinstance(value, SharedBytes) else value
+
+def _run_job(fn: Callable, args: tuple, kwargs: dict) -> Any:
+    """Entry point inside the worker: materialise shared buffers, then call ``fn``"""
+    args = tuple(_resolve(arg) for arg in args)
+    kwargs = {key: _resolve(value) for key, value in kwargs.items()}
+    return fn(*args, **kwargs)
+
+class CPUPool:
+    """Runs CPU-bound functions in worker processes without blocking the event loop.
+
+    The pool is a set of single-process shards. Jobs submitted with a
+    ``key`` always land on the same shard, so per-process caches (decoded
+    images, fonts, placeholders) keep hitting; other jobs go round-robin.
+    Each shard admits at most ``max_pending`` jobs at once and further
+    callers wait, which bounds queue depth and memory under load.
+    """
+    def __init__(self, workers: int = CPU_POOL_WORKERS, max_pending: int = CPU_POOL_MAX_PENDING, start_method: str = CPU_POOL_START_METHOD):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.start_method = start_method
+        self.submitted = 0
+        self.fallbacks = 0
+        self._shards: List[Optional[ProcessPoolExecutor]] = [None] * workers
+        self._slots: Optional[List[asyncio.Semaphore]] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._round_robin = itertools.count()
+
+    def _executor(self, index: int) -> ProcessPoolExecutor:
+        executor = self._shards[index]
+        if executor is None:
+            context = multiprocessing.get_context(self.start_method)
+            executor = ProcessPoolExecutor(max_workers=1, mp_context=context)
+            self._shards[index] = executor
+        return executor
+
+    def _semaphores(self) -> List[asyncio.Semaphore]:
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._loop is not loop:
+            self._slots = [asyncio.Semaphore(self.max_pending) for _ in range(self.workers)]
+            self._loop = loop
+        return self._slots
+
+    def _shard_for(self, key: Optional[Hashable]) -> int:
+        if key is None:
+            return next(self._round_robin) % self.workers
+        return zlib.crc32(repr(key).encode()) % self.workers
+
+    async def run(self, fn: Callable, *args, key: Optional[Hashable] = None, **kwargs) -> Any:
+        """Run ``fn(*args, **kwargs)`` in a worker process and return its result"""
+        loop = asyncio.get_running_loop()
+        if self.workers <= 0:
+            return await loop.run_in_executor(None, lambda: fn(*args, **kwargs))
+
+        index = self._shard_for(key)
+        async with self._semaphores()[index]:
+            segments: List[shared_memory.SharedMemory] = []
+            try:
+                try:
+                    shared_args = tuple(_share(arg, segments) for arg in args)
+                    shared_kwargs = {name: _share(value, segments) for name, value in kwargs.items()}
+                except OSError as e:
+                    # No usable shared memory (e.g. read-only /dev/shm)
+                    print(f"⚠️ CPU pool shared memory unavailable, running on a thread: {str(e)}")
+                else:
+                    try:
+                        future = self._executor(index).submit(_run_job, fn, shared_args, shared_kwargs)
+                    except (OSError, NotImplementedError) as e:
+                        # No SemLock or /dev/shm (e.g. AWS Lambda): stay on threads from now on
+                        if self.workers > 0:
+                            print(f"⚠️ CPU pool cannot start worker processes, running on threads: {str(e)}")
+                            self.shutdown()
+                            self.workers = 0
+                    else:
+                        self.submitted += 1
+                        return await asyncio.wrap_future(future)
+            except BrokenProcessPool as e:
+                # A dead worker should not fail the request; the shard restarts on next use
+                print(f"⚠️ CPU pool shard {index} died, running on a thread: {str(e)}")
+                self._shards[index] = None
+            finally:
+                for shm in segments:
+                    shm.close()
+                    shm.unlink()
+            self.fallbacks += 1
+            return await loop.run_in_executor(None, lambda: fn(*args, **kwargs))
+
+    async def run_on_each(self, fn: Callable) -> List[Any]:
+        """Call ``fn()`` once in every running worker and return the results.
+
+        Shards that have not started are skipped rather than spawned, and
+        dead ones are left out.
+        """
+        loop = asyncio.get_running_loop()
+        executors = [executor for executor in self._shards if executor is not None]
+        results = await asyncio.gather(
+            *(loop.run_in_executor(executor, fn) for executor in executors),
+            return_exceptions=True
+        )
+        return [result for result in results if not isinstance(result, BaseException)]
+
+    def shutdown(self) -> None:
+        for index, executor in enumerate(self._shards):
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+                self._shards[index] = None
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_pending_per_worker": self.max_pending,
+            "in_flight": sum(self.max_pending - slot._value for slot in self._slots) if self._slots else 0,
+            "submitted": self.submitted,
+            "fallbacks": self.fallbacks,
+        }
+
+cpu_pool = CPUPool()
@@ -1,13 +1,20 @@
-import requests
+import asyncio
+import inspect
 import json
 import os
 from dotenv import load_dotenv
-from typing import List
-import base64
+from typing import Any, Callable, List, Optional, Tuple
 from io import BytesIO
 from PIL import Image
 import uuid
+import zlib
+from functools import lru_cache
 from datetime import datetime
+from ai_agent.http_client import get_client, backoff_delay, inference_url
+from ai_agent.rate_limit import model_rate_limiter
+from ai_agent.singleflight import SingleFlight
+from ai_agent.cache import LRUCache
+from ai_agent.generation_cache import generation_cache
 
 load_dotenv()
 
@@ -16,15 +23,59 @@ HUGGINGFACE_API_KEY = os.getenv("HUGGINGFACE_API_KEY")
 HUGGINGFACE_TEXT_MODEL = os.getenv("HUGGINGFACE_TEXT_MODEL")
 HUGGINGFACE_IMAGE_MODEL = os.getenv("HUGGINGFACE_IMAGE_MODEL")
 
-def generate_text_prompt(event_type: str, theme: str) -> str:
-    """Generate enhanced prompt using GPT-2"""
+# Multi-design generation
+DESIGN_CONCURRENCY = int(os.getenv("DESIGN_CONCURRENCY", "5"))  # inference calls in flight per request
+DESIGN_DEADLINE = float(os.getenv("DESIGN_DEADLINE", "60"))  # seconds before returning partial results
+DESIGN_MAX_ATTEMPTS = int(os.getenv("DESIGN_MAX_ATTEMPTS", "5"))  # per design slot
+DESIGN_RETRY_DELAY = float(os.getenv("DESIGN_RETRY_DELAY", "2"))  # base backoff, seconds
+# How slots differ from each other: "seed", "prompt", "both" or "none"
+DESIGN_VARIATION = os.getenv("DESIGN_VARIATION", "seed").lower()
+PROMPT_VARIATIONS = [
+    "wide composition",
+    "close-up details",
+    "soft pastel palette",
+    "bold vibrant palette",
+    "minimalist layout",
+]
+PLACEHOLDER_COLORS = ('#FF5733', '#33FF57', '#3357FF', '#F333FF', '#FF3333')
+PLACEHOLDER_SIZE = (512, 512)
+
+# Identical in-flight inference calls (same model, prompt, params and seed) share one request
+inflight_designs = SingleFlight()
+
+# Enhanced prompts per (event_type, theme), so repeat searches skip the text model
+PROMPT_CACHE_SIZE = int(os.getenv("PROMPT_CACHE_SIZE", "512"))
+PROMPT_CACHE_TTL = float(os.getenv("PROMPT_CACHE_TTL", "3600"))  # seconds
+# Pairs enhanced at startup, e.g. "wedding:floral,birthday:minimalist"
+PROMPT_WARMUP = os.getenv("PROMPT_WARMUP", "")
+enhanced_prompts = LRUCache(max_items=PROMPT_CACHE_SIZE, ttl=PROMPT_CACHE_TTL)
+inflight_prompts = SingleFlight()
+
+async def generate_text_prompt(event_type: str, theme: str) -> str:
+    """Generate enhanced prompt using GPT-2, memoized per (event_type, theme).
+
+    Concurrent requests for the same pair share one text model call; only
+    successful enhancements are remembered, so a failure is retried next time.
+    """
+    key = (event_type, theme)
+    prompt = enhanced_prompts.get(key)
+    if prompt is not None:
+        return prompt
+
+    prompt, enhanced = await inflight_prompts.do(key, lambda: _enhance_prompt(event_type, theme))
+    if enhanced:
+        enhanced_prompts.put(key, prompt)
+    return prompt
+
+async def _enhance_prompt(event_type: str, theme: str) -> Tuple[str, bool]:
+    """Returns ``(prompt, enhanced)``; on failure the prompt is a plain fallback"""
     try:
-        API_URL = f"https://api-inference.huggingface.co/models/{HUGGINGFACE_TEXT_MODEL}"
+        API_URL = inference_url(HUGGINGFACE_TEXT_MODEL)
         headers = {"Authorization": f"Bearer {HUGGINGFACE_API_KEY}"}
         
         base_prompt = f"Create a {theme} design for a {event_type} event:"
         
-        response = requests.post(
+        response = await get_client().post(
             API_URL,
             headers=headers,
             json={"inputs": base_prompt}
@@ -32,122 +83,217 @@ def generate_text_prompt(event_type: str, theme: str) -> str:
         
         if response.status_code == 200:
             enhanced_prompt = response.json()[0]['generated_text']
-            return f"{enhanced_prompt}, high quality, professional, detailed"
+            return f"{enhanced_prompt}, high quality, professional, detailed", True
         
-        return base_prompt
+        return base_prompt, False
         
     except Exception as e:
         print(f"Error generating prompt: {str(e)}")
-        return f"Create a {theme} design for a {event_type} event, high quality, professional"
+        return f"Create a {theme} design for a {event_type} event, high quality, professional", False
+
+def parse_prompt_warmup(value: str = PROMPT_WARMUP) -> List[Tuple[str, str]]:
+    """Parse ``"event:theme,event:theme"`` into pairs, skipping malformed items"""
+    pairs = []
+    for item in value.split(","):
+        event_type, sep, theme = item.partition(":")
+        if sep and event_type.strip() and theme.strip():
+            pairs.append((event_type.strip(), theme.strip()))
+    return pairs
+
+async def warm_prompt_cache(pairs: Optional[List[Tuple[str, str]]] = None) -> int:
+    """Enhance common (event_type, theme) pairs ahead of traffic; returns how many are cached"""
+    pairs = parse_prompt_warmup() if pairs is None else pairs
+    if not pairs or not HUGGINGFACE_API_KEY:
+        return 0
+    await asyncio.gather(*(generate_text_prompt(event_type, theme) for event_type, theme in pairs))
+    warmed = sum(1 for pair in pairs if pair in enhanced_prompts)
+    print(f"🔥 Warmed {warmed}/{len(pairs)} design prompts")
+    return warmed
+
+def design_parameters(seed: Optional[int] = None) -> dict:
+    parameters = {
+        "negative_prompt": "low quality, blurry, bad art, text, watermark",
+        "num_inference_steps": 30,
+        "guidance_scale": 7.5,
+        "width": 512,
+        "height": 512
+    }
+    if seed is not None:
+        parameters["seed"] = seed
+    return parameters
+
+def slot_variation(prompt: str, slot: int) -> Tuple[str, Optional[int]]:
+    """Prompt and seed for one design slot so each slot yields a distinct image.
+
+    Seeds are derived from the prompt, so identical searches produce
+    identical requests that can be coalesced and cached.
+    """
+    seed = None
+    if DESIGN_VARIATION in ("seed", "both"):
+        seed = (zlib.crc32(prompt.encode()) + slot) % (2 ** 31)
+    if DESIGN_VARIATION in ("prompt", "both") and slot > 0:
+        prompt = f"{prompt}, {PROMPT_VARIATIONS[(slot - 1) % len(PROMPT_VARIATIONS)]}"
+    return prompt, seed
+
+async def _post_design_request(api_url: str, headers: dict, prompt: str, parameters: dict) -> Tuple[Optional[bytes], bool]:
+    await model_rate_limiter(HUGGINGFACE_IMAGE_MODEL or api_url).acquire()
+    response = await get_client().post(
+        api_url,
+        headers=headers,
+        json={
+            "inputs": prompt,
+            "parameters": parameters
+        }
+    )
+
+    # Check if model is still loading or we are being throttled
+    if response.status_code in (429, 503):
+        print(f"Model busy ({response.status_code}), will retry...")
+        return None, True
+
+    # Check for successful response
+    if response.status_code != 200:
+        print(f"Image API Error {response.status_code}: {response.text}")
+        return None, response.status_code >= 500
+
+    return response.content, False
 
-def generate_designs(event_type: str, theme: str, num_designs: int = 5) -> List[dict]:
-    """Generate multiple designs using Stable Diffusion"""
+async def request_design_image(api_url: str, headers: dict, prompt: str, seed: Optional[int] = None, use_cache: bool = True) -> Tuple[Optional[bytes], bool]:
+    """One rate-limited inference call, shared with identical concurrent calls.
+
+    Results are served from / saved to the generation cache unless
+    ``use_cache`` is False. Returns ``(image_bytes, retryable)``; image
+    bytes are None on failure.
+    """
+    parameters = design_parameters(seed)
+    cache_key = generation_cache.key(
+        HUGGINGFACE_IMAGE_MODEL or api_url, prompt, parameters["negative_prompt"],
+        parameters["num_inference_steps"], parameters["guidance_scale"],
+        (parameters["width"], parameters["height"]), seed
+    )
+    cached = generation_cache.get(cache_key, use_cache)
+    if cached is not None:
+        return cached, False
+
+    key = (api_url, prompt, json.dumps(parameters, sort_keys=True))
+    image_data, retryable = await inflight_designs.do(key, lambda: _post_design_request(api_url, headers, prompt, parameters))
+    if image_data:
+        generation_cache.put(cache_key, image_data, use_cache)
+    return image_data, retryable
+
+async def _notify(on_design: Callable[[dict], Any], design: dict) -> None:
+    result = on_design(design)
+    if inspect.isawaitable(result):
+        await result
+
+async def generate_designs(event_type: str, theme: str, num_designs: int = 5, deadline: float = DESIGN_DEADLINE, use_cache: bool = True, on_design: Optional[Callable[[dict], Any]] = None) -> List[dict]:
+    """Generate multiple designs using Stable Diffusion.
+
+    Slots are requested concurrently (at most ``DESIGN_CONCURRENCY`` in
+    flight) and retried with backoff until ``num_designs`` images exist
+    or ``deadline`` seconds pass; whatever finished by then is returned.
+    ``use_cache=False`` bypasses the generation cache. ``on_design`` is
+    called with each design (placeholders included) as soon as it exists;
+    it may be a coroutine function, in which case it is awaited.
+    """
     
-    API_URL = f"https://api-inference.huggingface.co/models/{HUGGINGFACE_IMAGE_MODEL}"
+    API_URL = inference_url(HUGGINGFACE_IMAGE_MODEL)
     headers = {
         "Authorization": f"Bearer {HUGGINGFACE_API_KEY}",
         "Content-Type": "application/json"
     }
     
-    prompt = generate_text_prompt(event_type, theme)
+    loop = asyncio.get_running_loop()
+    give_up_at = loop.time() + deadline
+    
+    prompt = await generate_text_prompt(event_type, theme)
     print(f"Using prompt: {prompt}")
     
     designs = []
-    try:
-        for i in range(num_designs):
+    in_flight = asyncio.Semaphore(DESIGN_CONCURRENCY)
+
+    async def fill_slot(slot: int) -> None:
+        slot_prompt, seed = slot_variation(prompt, slot)
+        for attempt in range(DESIGN_MAX_ATTEMPTS):
+            retryable = True
             try:
-                # Request image generation
-                response = requests.post(
-                    API_URL,
-                    headers=headers,
-                    json={
-                        "inputs": prompt,
-                        "parameters": {
-                            "negative_prompt": "low quality, blurry, bad art, text, watermark",
-                            "num_inference_steps": 30,
-                            "guidance_scale": 7.5,
-                            "width": 512,
-                            "height": 512
+                async with in_flight:
+                    image_data, retryable = await request_design_image(API_URL, headers, slot_prompt, seed, use_cache)
+                if image_data:
+                    design = {
+                        "id": str(uuid.uuid4()),
+                        "image_bytes": image_data,
+                        "similarity_score": 100.0,
+                        "metadata": {
+                            "event_type": event_type,
+                            "theme": theme,
+                            "model": HUGGINGFACE_IMAGE_MODEL,
+                            "prompt": slot_prompt,
+                            "seed": seed,
+                            "created_at": str(datetime.now())
                         }
                     }
-                )
-
-                # Check if model is still loading
-                if response.status_code == 503:
-                    print("Model is loading, waiting for retry...")
-                    continue
-
-                # Check for successful response
-                if response.status_code != 200:
-                    print(f"Image API Error {response.status_code}: {response.text}")
-                    continue
-
-                # Get image data
-                image_data = response.content
-                
-                # Create a unique ID
-                design_id = str(uuid.uuid4())
-                
-                # Convert to base64 for URL display
-                img_base64 = base64.b64encode(image_data).decode('utf-8')
-                img_url = f"data:image/png;base64,{img_base64}"
-                
-                # Add to designs list
-                designs.append({
-                    "id": design_id,
-                    "url": img_url,
-                    "image_bytes": image_data,
-                    "similarity_score": 100.0,
-                    "metadata": {
-                        "event_type": event_type,
-                        "theme": theme,
-                        "model": HUGGINGFACE_IMAGE_MODEL,
-                        "prompt": prompt,
-                        "created_at": str(datetime.now())
-                    }
-                })
-                
-                print(f"Successfully generated design {i+1}/{num_designs}")
-                
+                    designs.append(design)
+                    if on_design is not None:
+                        await _notify(on_design, design)
+                    print(f"Successfully generated design {len(designs)}/{num_designs}")
+                    return
             except Exception as img_error:
-                print(f"Error processing design {i+1}: {str(img_error)}")
-                continue
+                print(f"Error processing design {slot + 1}: {str(img_error)}")
             
+            remaining = give_up_at - loop.time()
+            if not retryable or remaining <= 0:
+                return
+            await asyncio.sleep(min(backoff_delay(attempt, DESIGN_RETRY_DELAY), remaining))
+
+    tasks = [asyncio.create_task(fill_slot(slot)) for slot in range(num_designs)]
+    try:
+        _, pending = await asyncio.wait(tasks, timeout=max(0, give_up_at - loop.time()))
+        if pending:
+            print(f"⏱️ Design deadline reached with {len(designs)}/{num_designs} designs")
     except Exception as e:
         print(f"Error in design generation: {str(e)}")
         print(f"API URL: {API_URL}")
         print(f"HF Key Set: {'Yes' if HUGGINGFACE_API_KEY else 'No'}")
+    finally:
+        # Also reached when the caller is cancelled (e.g. a client disconnect)
+        for task in tasks:
+            task.cancel()
     
     # If no designs were generated, use placeholders
     if not designs:
         print("Using placeholder designs...")
         designs = generate_placeholder_designs(event_type, theme, num_designs)
+        if on_design is not None:
+            for design in designs:
+                await _notify(on_design, design)
     
-    return designs
+    return designs[:num_designs]
+
+@lru_cache(maxsize=None)
+def placeholder_design_image(color: str, size: Tuple[int, int] = PLACEHOLDER_SIZE) -> bytes:
+    """Solid-color PNG, rendered once per (color, size) and shared by every request"""
+    img = Image.new('RGB', size, color)
+    img_io = BytesIO()
+    img.save(img_io, format='PNG')
+    return img_io.getvalue()
+
+def warm_placeholder_designs() -> None:
+    """Render the placeholder set up front so an outage never pays for encoding"""
+    for color in PLACEHOLDER_COLORS:
+        placeholder_design_image(color)
 
 def generate_placeholder_designs(event_type: str, theme: str, num_designs: int) -> List[dict]:
     """Generate placeholder designs when API fails"""
     placeholders = []
-    colors = ['#FF5733', '#33FF57', '#3357FF', '#F333FF', '#FF3333']
     
     for i in range(num_designs):
         design_id = str(uuid.uuid4())
-        color = colors[i % len(colors)]
-        
-        # Create a colored placeholder image
-        img = Image.new('RGB', (512, 512), color)
-        img_io = BytesIO()
-        img.save(img_io, format='PNG')
-        img_bytes = img_io.getvalue()
-        
-        # Convert to base64
-        img_base64 = base64.b64encode(img_bytes).decode('utf-8')
-        img_url = f"data:image/png;base64,{img_base64}"
+        color = PLACEHOLDER_COLORS[i % len(PLACEHOLDER_COLORS)]
         
         placeholders.append({
             "id": design_id,
-            "url": img_url,
-            "image_bytes": img_bytes,
+            "image_bytes": placeholder_design_image(color),
             "similarity_score": 0.0,
             "metadata": {
                 "event_type": event_type,
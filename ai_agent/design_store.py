@@ -0,0 +1,161 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional
+from ai_agent.blob_store import TRIM_LOW_WATER
+from ai_agent.cache import LRUCache
+
+# In-memory budget for design records; images live in the blob store, so this covers metadata only
+DESIGN_STORE_MAX_BYTES = int(os.getenv("DESIGN_STORE_MAX_BYTES", str(32 * 1024 * 1024)))
+# Optional idle lifetime for in-memory records, in seconds (0 disables)
+DESIGN_STORE_TTL = float(os.getenv("DESIGN_STORE_TTL", "0"))
+# Evicted records spill here; Vercel only allows writes under /tmp
+DESIGN_STORE_DIR = os.getenv("DESIGN_STORE_DIR", os.path.join(tempfile.gettempdir(), "ai-photos-designs"))
+DESIGN_STORE_DISK_MAX_BYTES = int(os.getenv("DESIGN_STORE_DISK_MAX_BYTES", str(256 * 1024 * 1024)))
+
+RECORD_OVERHEAD = 256  # rough allowance for dict and key overhead per record
+
+def record_size(record: dict) -> int:
+    """Approximate memory footprint of a record from its JSON encoding"""
+    return len(json.dumps(record, default=str)) + RECORD_OVERHEAD
+
+class DiskTier:
+    """Spill area for evicted design records, one ``<id>.json`` file each.
+
+    Spill order is tracked in memory; past ``max_bytes`` the oldest
+    records are dropped down to ``TRIM_LOW_WATER`` of the budget.
+    """
+    def __init__(self, directory: str = DESIGN_STORE_DIR, max_bytes: int = DESIGN_STORE_DISK_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        entries = sorted(
+            (os.path.getmtime(os.path.join(directory, name)), name[:-len(".json")], os.path.getsize(os.path.join(directory, name)))
+            for name in os.listdir(directory) if name.endswith(".json")
+        )
+        self._index: "OrderedDict[str, int]" = OrderedDict((name, size) for _, name, size in entries)
+        self.current_bytes = sum(self._index.values())
+
+    @staticmethod
+    def _name(design_id: str) -> str:
+        return "".join(c for c in design_id if c.isalnum() or c in "-_")
+
+    def _path(self, design_id: str) -> str:
+        return os.path.join(self.directory, self._name(design_id) + ".json")
+
+    def write(self, design_id: str, record: dict) -> None:
+        path = self._path(design_id)
+        with self._lock:
+            self._delete(design_id)
+            with open(path, "w") as f:
+                json.dump(record, f, default=str)
+            size = os.path.getsize(path)
+            self._index[self._name(design_id)] = size
+            self.current_bytes += size
+            self._trim()
+
+    def read(self, design_id: str) -> Optional[dict]:
+        try:
+            with open(self._path(design_id)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"⚠️ Could not read spilled design {design_id}: {str(e)}")
+            return None
+
+    def delete(self, design_id: str) -> None:
+        with self._lock:
+            self._delete(design_id)
+
+    def _delete(self, design_id: str) -> None:
+        self.current_bytes -= self._index.pop(self._name(design_id), 0)
+        try:
+            os.remove(self._path(design_id))
+        except FileNotFoundError:
+            pass
+
+    def _trim(self) -> None:
+        """Drop the oldest spilled records once the disk budget is exceeded"""
+        if self.current_bytes <= self.max_bytes:
+            return
+        low_water = self.max_bytes * TRIM_LOW_WATER
+        while self.current_bytes > low_water and self._index:
+            self._delete(next(iter(self._index)))
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+class DesignStore(LRUCache):
+    """Byte-bounded store for design records with a disk spill tier.
+
+    Records are plain JSON-serializable dicts; image bytes live in the
+    blob store and records reference them by ``"image_hash"``, so the
+    byte budget is spent on metadata alone.
+    When the memory budget is exceeded (or a record goes unread for the
+    TTL) the least recently used record is written to disk and
+    transparently reloaded on the next ``get`` or ``in`` check.
+    """
+    def __init__(self, max_bytes: int = DESIGN_STORE_MAX_BYTES, ttl: Optional[float] = DESIGN_STORE_TTL or None, disk: Optional[DiskTier] = None):
+        super().__init__(max_bytes=max_bytes, sizeof=record_size, ttl=ttl)
+        self.disk = disk
+        self.disk_hits = 0
+        self.spills = 0
+
+    def _on_evict(self, key: Hashable, value: dict) -> None:
+        if self.disk is None:
+            return
+        try:
+            self.disk.write(key, value)
+            self.spills += 1
+        except Exception as e:
+            print(f"⚠️ Could not spill design {key} to disk: {str(e)}")
+
+    def get(self, design_id: str, default: Optional[dict] = None) -> Optional[dict]:
+        record = super().get(design_id)
+        if record is not None:
+            self._touch(design_id)
+            return record
+        if self.disk is None:
+            return default
+        record = self.disk.read(design_id)
+        if record is None:
+            return default
+        self.disk_hits += 1
+        self.disk.delete(design_id)
+        self.put(design_id, record)
+        return record
+
+    def _touch(self, design_id: str) -> None:
+        """Restart a record's TTL so it only expires after sitting unread"""
+        with self._lock:
+            entry = self._entries.get(design_id)
+            if entry is not None:
+                self._entries[design_id] = (entry[0], entry[1], time.monotonic())
+
+    def __contains__(self, design_id: str) -> bool:
+        return self.get(design_id) is not None
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats.update({
+            "disk_hits": self.disk_hits,
+            "spills": self.spills,
+            "disk_entries": len(self.disk) if self.disk else 0,
+            "disk_bytes": self.disk.current_bytes if self.disk else 0,
+        })
+        return stats
+
+def create_design_store() -> DesignStore:
+    try:
+        disk = DiskTier()
+    except Exception as e:
+        print(f"⚠️ Design store disk tier disabled: {str(e)}")
+        disk = None
+    return DesignStore(disk=disk)
+
+design_store = create_design_store()
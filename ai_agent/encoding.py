@@ -0,0 +1,192 @@
+import hashlib
+import os
+from io import BytesIO
+from typing import Optional, Tuple, Union
+from PIL import Image
+from ai_agent.blob_store import blob_store
+from ai_agent.cache import LRUCache
+from ai_agent.cpu_pool import cpu_pool
+
+DEFAULT_IMAGE_FORMAT = os.getenv("DEFAULT_IMAGE_FORMAT", "png").lower()
+JPEG_QUALITY = int(os.getenv("JPEG_QUALITY", "85"))
+WEBP_QUALITY = int(os.getenv("WEBP_QUALITY", "80"))
+PNG_COMPRESS_LEVEL = int(os.getenv("PNG_COMPRESS_LEVEL", "6"))
+ENCODED_VARIANT_CACHE_BYTES = int(os.getenv("ENCODED_VARIANT_CACHE_BYTES", str(128 * 1024 * 1024)))
+MAX_VARIANT_DIMENSION = int(os.getenv("MAX_VARIANT_DIMENSION", "4096"))
+# Requested widths/heights are rounded up to one of these; larger ones keep the source size
+VARIANT_SIZE_BUCKETS = tuple(sorted(int(size) for size in os.getenv("VARIANT_SIZE_BUCKETS", "128,256,512,1024").split(",") if size.strip()))
+
+FIT_MODES = ("contain", "cover", "fill")
+
+MEDIA_TYPES = {
+    "png": "image/png",
+    "jpeg": "image/jpeg",
+    "webp": "image/webp",
+}
+FORMAT_ALIASES = {"jpg": "jpeg", "image/jpg": "jpeg"}
+FORMAT_ALIASES.update({media_type: fmt for fmt, media_type in MEDIA_TYPES.items()})
+FILE_EXTENSIONS = {"png": "png", "jpeg": "jpg", "webp": "webp"}
+
+# Encoded variants keyed by (content hash, (width, height, fit), format, quality)
+encoded_variants = LRUCache(max_bytes=ENCODED_VARIANT_CACHE_BYTES)
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def detect_format(data: bytes) -> Optional[str]:
+    """Identify PNG, JPEG or WebP payloads from their magic bytes"""
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return "png"
+    if data[:3] == b"\xff\xd8\xff":
+        return "jpeg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+def normalize_format(fmt: Optional[str]) -> Optional[str]:
+    if not fmt:
+        return None
+    fmt = fmt.strip().lower()
+    fmt = FORMAT_ALIASES.get(fmt, fmt)
+    return fmt if fmt in MEDIA_TYPES else None
+
+def negotiate_format(accept: Optional[str], requested: Optional[str] = None) -> str:
+    """Pick an output format from an explicit ``format`` value or an Accept header.
+
+    An explicit format always wins. Otherwise WebP is used when the client
+    lists it, falling back to ``DEFAULT_IMAGE_FORMAT``.
+    """
+    fmt = normalize_format(requested)
+    if fmt:
+        return fmt
+
+    accepted = {}
+    for part in (accept or "").split(","):
+        media_type, _, params = part.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[media_type.strip().lower()] = q
+
+    if accepted.get("image/webp", 0) > 0:
+        return "webp"
+    default = normalize_format(DEFAULT_IMAGE_FORMAT) or "png"
+    if accepted and not any(accepted.get(t, 0) > 0 for t in (MEDIA_TYPES[default], "image/*", "*/*")):
+        for fmt, media_type in MEDIA_TYPES.items():
+            if accepted.get(media_type, 0) > 0:
+                return fmt
+    return default
+
+def encode_image(image: Union[Image.Image, bytes], fmt: str, quality: Optional[int] = None) -> bytes:
+    """Encode an image (or encoded image bytes) to ``fmt``.
+
+    ``quality`` is 1-100 for JPEG/WebP (0 counts as 1) and the PNG
+    compression level 0-9 (larger values mean 9).
+    """
+    if isinstance(image, (bytes, bytearray)):
+        image = Image.open(BytesIO(image))
+    output = BytesIO()
+    if fmt == "jpeg":
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        image.save(output, format="JPEG", quality=JPEG_QUALITY if quality is None else max(1, quality), optimize=True, progressive=True)
+    elif fmt == "webp":
+        image.save(output, format="WEBP", quality=WEBP_QUALITY if quality is None else max(1, quality), method=4)
+    else:
+        image.save(output, format="PNG", compress_level=PNG_COMPRESS_LEVEL if quality is None else max(0, min(9, quality)))
+    return output.getvalue()
+
+def snap_dimension(size: Optional[int]) -> Optional[int]:
+    """Round a requested dimension up to the nearest size bucket.
+
+    Keeps the number of distinct variants per image small, so arbitrary
+    sizes cannot flush the variant cache or force a fresh resize each.
+    """
+    if not size:
+        return None
+    for bucket in VARIANT_SIZE_BUCKETS:
+        if size <= bucket:
+            return bucket
+    return None
+
+def target_size(source: Tuple[int, int], width: Optional[int], height: Optional[int], fit: str) -> Tuple[int, int]:
+    """Work out the output size for a resize request; never upscales.
+
+    ``fill`` stretches each axis independently, but no further than the source.
+    """
+    src_w, src_h = source
+    width = min(width, MAX_VARIANT_DIMENSION) if width else None
+    height = min(height, MAX_VARIANT_DIMENSION) if height else None
+    if fit == "fill":
+        return (min(width or src_w, src_w), min(height or src_h, src_h))
+
+    scales = []
+    if width:
+        scales.append(width / src_w)
+    if height:
+        scales.append(height / src_h)
+    scale = max(scales) if fit == "cover" and len(scales) == 2 else min(scales)
+    scale = min(scale, 1.0)
+    return (max(1, round(src_w * scale)), max(1, round(src_h * scale)))
+
+def resize_image(image_bytes: bytes, width: Optional[int], height: Optional[int], fit: str = "contain") -> Image.Image:
+    """Decode and downscale an image as cheaply as possible.
+
+    JPEG sources are decoded at reduced scale via ``draft``; the remaining
+    downscale uses ``reduce`` (through ``reducing_gap``) before the final
+    Lanczos pass. ``cover`` crops the centre to the exact requested box.
+    """
+    image = Image.open(BytesIO(image_bytes))
+    size = target_size(image.size, width, height, fit)
+    if image.format == "JPEG":
+        image.draft("RGB", size)
+        size = target_size(image.size, width, height, fit) if fit != "fill" else size
+    if size != image.size:
+        image = image.resize(size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+
+    if fit == "cover" and width and height:
+        box_w, box_h = min(width, image.width), min(height, image.height)
+        left = (image.width - box_w) // 2
+        top = (image.height - box_h) // 2
+        image = image.crop((left, top, left + box_w, top + box_h))
+    return image
+
+def needs_variant(source_format: Optional[str], fmt: str, quality: Optional[int] = None, width: Optional[int] = None, height: Optional[int] = None) -> bool:
+    """False when the stored bytes can be served as they are"""
+    return bool(width or height or quality is not None or source_format != fmt)
+
+def render_variant(image_bytes: bytes, fmt: str, quality: Optional[int] = None, width: Optional[int] = None, height: Optional[int] = None, fit: str = "contain") -> bytes:
+    """Encode ``image_bytes`` as ``fmt``, resized when asked; unchanged bytes come back as they are"""
+    if not needs_variant(detect_format(image_bytes), fmt, quality, width, height):
+        return image_bytes
+    image = resize_image(image_bytes, width, height, fit) if width or height else image_bytes
+    return encode_image(image, fmt, quality)
+
+def render_blob_variant(digest: str, fmt: str, quality: Optional[int] = None, width: Optional[int] = None, height: Optional[int] = None, fit: str = "contain") -> Optional[bytes]:
+    """``render_variant`` for a blob, loaded here so the bytes never cross the process boundary"""
+    image_bytes = blob_store.get(digest)
+    if image_bytes is None:
+        return None
+    return render_variant(image_bytes, fmt, quality, width, height, fit)
+
+async def get_encoded_variant(digest: str, fmt: str, quality: Optional[int] = None, width: Optional[int] = None, height: Optional[int] = None, fit: str = "contain") -> Tuple[Optional[bytes], str]:
+    """Return a blob encoded as ``fmt`` (and optionally resized), cached by content.
+
+    Only the cache lookup runs on the event loop; misses are decoded,
+    resized and encoded on the CPU pool. ``quality`` is the JPEG/WebP
+    quality or the PNG compression level. The bytes are None when the blob
+    is gone.
+    """
+    resize = (width, height, fit) if width or height else None
+    cache_key = (digest, resize, fmt, quality)
+    data = encoded_variants.get(cache_key)
+    if data is None:
+        data = await cpu_pool.run(render_blob_variant, digest, fmt, quality, width, height, fit, key=digest)
+        if data is not None:
+            encoded_variants.put(cache_key, data)
+    return data, MEDIA_TYPES[fmt]
@@ -0,0 +1,114 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from PIL import ImageFont
+
+# Directories scanned for .ttf/.otf files, separated by os.pathsep
+FONT_DIRS = os.getenv("FONT_DIR", "fonts" + os.pathsep + "/usr/share/fonts")
+DEFAULT_FONT_FAMILY = os.getenv("DEFAULT_FONT_FAMILY", "DejaVu Sans")
+FONT_CACHE_SIZE = int(os.getenv("FONT_CACHE_SIZE", "64"))
+
+FONT_EXTENSIONS = (".ttf", ".otf", ".ttc")
+
+# Face names fonts use for each form style, in order of preference
+STYLE_ALIASES = {
+    "normal": ("regular", "book", "roman", "normal", "medium"),
+    "bold": ("bold", "semibold", "demibold", "black", "heavy"),
+    "italic": ("italic", "oblique"),
+    "bold-italic": ("bold italic", "bold oblique", "semibold italic"),
+}
+
+class FontRegistry:
+    """Resolves font families on disk once and caches sized ImageFont objects"""
+    def __init__(self, font_dirs: str = FONT_DIRS, cache_size: int = FONT_CACHE_SIZE):
+        self.font_dirs = [d for d in font_dirs.split(os.pathsep) if d]
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._faces: Optional[Dict[str, Dict[str, str]]] = None
+        self._cache: "OrderedDict[Tuple[str, int, str], ImageFont.ImageFont]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _scan(self) -> Dict[str, Dict[str, str]]:
+        """Map lowercase family name -> lowercase face name -> file path"""
+        faces: Dict[str, Dict[str, str]] = {}
+        for font_dir in self.font_dirs:
+            if not os.path.isdir(font_dir):
+                continue
+            for root, _, files in os.walk(font_dir):
+                for filename in sorted(files):
+                    if not filename.lower().endswith(FONT_EXTENSIONS):
+                        continue
+                    path = os.path.join(root, filename)
+                    try:
+                        family, face = ImageFont.truetype(path, 10).getname()
+                    except Exception:
+                        continue
+                    faces.setdefault((family or "").lower(), {}).setdefault((face or "regular").lower(), path)
+        print(f"🔤 Font registry: {len(faces)} families found in {', '.join(self.font_dirs)}")
+        return faces
+
+    @property
+    def faces(self) -> Dict[str, Dict[str, str]]:
+        if self._faces is None:
+            with self._lock:
+                if self._faces is None:
+                    self._faces = self._scan()
+        return self._faces
+
+    def resolve(self, family: Optional[str], style: str = "normal") -> Optional[str]:
+        """Return the font file for a family/style, or None if nothing matches"""
+        candidates = self.faces.get((family or DEFAULT_FONT_FAMILY).lower())
+        if not candidates:
+            candidates = self.faces.get(DEFAULT_FONT_FAMILY.lower())
+        if not candidates:
+            return None
+        for face in STYLE_ALIASES.get(style, STYLE_ALIASES["normal"]):
+            if face in candidates:
+                return candidates[face]
+        for face in STYLE_ALIASES["normal"]:
+            if face in candidates:
+                return candidates[face]
+        return next(iter(candidates.values()))
+
+    def get_font(self, size: int, family: Optional[str] = None, style: str = "normal") -> ImageFont.ImageFont:
+        """Return a cached font instance for (family, size, style)"""
+        style = (style or "normal").lower()
+        key = ((family or DEFAULT_FONT_FAMILY).lower(), int(size), style)
+        with self._lock:
+            font = self._cache.get(key)
+            if font is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return font
+            self.misses += 1
+
+        path = self.resolve(family, style)
+        try:
+            font = ImageFont.truetype(path, int(size)) if path else ImageFont.load_default(int(size))
+        except Exception as e:
+            print(f"⚠️ Could not load font {path}: {str(e)}")
+            font = ImageFont.load_default()
+
+        with self._lock:
+            self._cache[key] = font
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return font
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "cached": len(self._cache),
+            "max_cached": self.cache_size,
+            "families": len(self.faces),
+        }
+
+font_registry = FontRegistry()
+
+def get_font(size: int, family: Optional[str] = None, style: str = "normal") -> ImageFont.ImageFont:
+    """Shortcut for the process-wide font registry"""
+    return font_registry.get_font(size, family, style)
@@ -0,0 +1,55 @@
+import hashlib
+import json
+import os
+import tempfile
+from typing import Optional, Tuple
+from ai_agent.blob_store import BlobStore
+
+# Disk cache of successful inference results; set GENERATION_CACHE_ENABLED=false to opt out
+GENERATION_CACHE_ENABLED = os.getenv("GENERATION_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+GENERATION_CACHE_DIR = os.getenv("GENERATION_CACHE_DIR", os.path.join(tempfile.gettempdir(), "ai-photos-generations"))
+GENERATION_CACHE_MAX_BYTES = int(os.getenv("GENERATION_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+class GenerationCache:
+    """Generated images keyed by everything that determines the output.
+
+    Entries are files named after a hash of the key; reads refresh their
+    mtime so the size cap evicts the least recently used results first.
+    """
+    def __init__(self, directory: str = GENERATION_CACHE_DIR, max_bytes: int = GENERATION_CACHE_MAX_BYTES, enabled: bool = GENERATION_CACHE_ENABLED):
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._store = BlobStore(directory, max_bytes) if enabled else None
+
+    @staticmethod
+    def key(model: str, prompt: str, negative_prompt: Optional[str] = None, steps: Optional[int] = None, guidance: Optional[float] = None, size: Optional[Tuple[int, int]] = None, seed: Optional[int] = None) -> str:
+        parts = [model, prompt, negative_prompt, steps, guidance, list(size) if size else None, seed]
+        return hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+
+    def get(self, key: str, use_cache: bool = True) -> Optional[bytes]:
+        if not (self.enabled and use_cache):
+            return None
+        data = self._store.get(key)
+        if data is None:
+            self.misses += 1
+            return None
+        self._store.touch(key)
+        self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes, use_cache: bool = True) -> None:
+        if not (self.enabled and use_cache) or not data:
+            return
+        try:
+            self._store.put_named(key, data)
+        except OSError as e:
+            print(f"⚠️ Could not cache generated image: {str(e)}")
+
+    def stats(self) -> dict:
+        stats = {"enabled": self.enabled, "hits": self.hits, "misses": self.misses}
+        if self._store is not None:
+            stats.update({"bytes": self._store.current_bytes, "max_bytes": self._store.max_bytes})
+        return stats
+
+generation_cache = GenerationCache()
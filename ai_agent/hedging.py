@@ -0,0 +1,80 @@
+import asyncio
+import os
+from typing import Awaitable, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Extra requests allowed per primary request, and how many may be saved up
+HEDGE_BUDGET = float(os.getenv("HEDGE_BUDGET", "0.1"))
+HEDGE_BURST = float(os.getenv("HEDGE_BURST", "5"))
+
+class Hedger:
+    """Races a backup request against a slow primary, within a spend budget.
+
+    Every primary request earns ``budget`` tokens (capped at ``burst``)
+    and each hedge spends one, so hedges stay at roughly ``budget`` extra
+    requests per request however slow the upstream gets.
+    """
+    def __init__(self, budget: float = HEDGE_BUDGET, burst: float = HEDGE_BURST):
+        self.budget = budget
+        self.burst = burst
+        self.tokens = burst
+        self.requests = 0
+        self.hedged = 0
+        self.backup_wins = 0
+        self.denied = 0
+
+    def _try_spend(self) -> bool:
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        self.denied += 1
+        return False
+
+    async def run(
+        self,
+        primary: Callable[[], Awaitable[Optional[T]]],
+        backup: Callable[[], Awaitable[Optional[T]]],
+        delay: float,
+    ) -> Optional[T]:
+        """Return the first non-None result; the slower request is cancelled.
+
+        ``backup`` only starts if ``primary`` has not finished after
+        ``delay`` seconds and the budget allows it. None means both failed.
+        """
+        self.requests += 1
+        self.tokens = min(self.burst, self.tokens + self.budget)
+
+        primary_task = asyncio.ensure_future(primary())
+        tasks = [primary_task]
+        try:
+            done, _ = await asyncio.wait({primary_task}, timeout=delay)
+            if done or not self._try_spend():
+                return await primary_task
+
+            self.hedged += 1
+            backup_task = asyncio.ensure_future(backup())
+            tasks.append(backup_task)
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and task.result() is not None:
+                        if task is backup_task:
+                            self.backup_wins += 1
+                        return task.result()
+            return None
+        finally:
+            # Also covers the caller being cancelled while either request runs
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "backup_wins": self.backup_wins,
+            "denied_by_budget": self.denied,
+            "budget": self.budget,
+        }
@@ -0,0 +1,85 @@
+import asyncio
+import os
+import random
+from typing import Iterable, Optional
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Shared connection pool for every outbound call (Hugging Face, Qdrant, Supabase)
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "120"))  # seconds; image inference is slow
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "200"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "50"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+
+RETRY_STATUSES = (429, 503)
+
+# Hugging Face inference endpoint; point it at loadtest/mock_inference.py for local runs
+HUGGINGFACE_INFERENCE_URL = os.getenv("HUGGINGFACE_INFERENCE_URL", "https://api-inference.huggingface.co/models").rstrip("/")
+
+def inference_url(model: str) -> str:
+    return f"{HUGGINGFACE_INFERENCE_URL}/{model}"
+
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def get_client() -> httpx.AsyncClient:
+    """Return the process-wide AsyncClient, creating it for the running event loop"""
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+            follow_redirects=True,
+        )
+        _client_loop = loop
+    return _client
+
+async def close_client() -> None:
+    global _client, _client_loop
+    if _client is not None and _client_loop is asyncio.get_running_loop():
+        await _client.aclose()
+    _client = None
+    _client_loop = None
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float = 30.0) -> float:
+    """Exponential backoff with full jitter"""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+async def request_with_retry(
+    method: str,
+    url: str,
+    max_retries: int = 3,
+    retry_delay: float = 2,
+    retry_statuses: Iterable[int] = RETRY_STATUSES,
+    label: str = "",
+    **kwargs
+) -> Optional[httpx.Response]:
+    """Send a request, retrying transport errors and retryable statuses with backoff.
+
+    Returns the last response received (which may still be an error
+    status) or None if every attempt failed at the transport level.
+    """
+    client = get_client()
+    response = None
+    for attempt in range(max_retries):
+        try:
+            response = await client.request(method, url, **kwargs)
+            if response.status_code not in retry_statuses:
+                return response
+            print(f"⏳ {label or url} returned {response.status_code} (attempt {attempt + 1}/{max_retries})")
+        except httpx.HTTPError as e:
+            print(f"❌ Error during attempt {attempt + 1} for {label or url}: {str(e)}")
+        if attempt < max_retries - 1:
+            await asyncio.sleep(backoff_delay(attempt, retry_delay))
+    return response
+
+async def post_with_retry(url: str, **kwargs) -> Optional[httpx.Response]:
+    return await request_with_retry("POST", url, **kwargs)
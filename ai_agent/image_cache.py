@@ -0,0 +1,82 @@
+import os
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from typing import Callable, Optional, Union
+from PIL import Image
+from ai_agent.cpu_pool import CPU_POOL_WORKERS
+
+# Memory budget for decoded images across all CPU pool workers, in bytes of
+# raw pixel data; each worker process keeps its own cache with an equal share
+DECODED_IMAGE_CACHE_BYTES = int(os.getenv("DECODED_IMAGE_CACHE_BYTES", str(256 * 1024 * 1024)))
+DECODED_IMAGE_CACHE_BYTES_PER_PROCESS = DECODED_IMAGE_CACHE_BYTES // max(1, CPU_POOL_WORKERS)
+
+def image_nbytes(image: Image.Image) -> int:
+    """Approximate in-memory size of a decoded image"""
+    return image.width * image.height * len(image.getbands())
+
+class DecodedImageCache:
+    """LRU cache of decoded RGBA images keyed by design id.
+
+    Cached images are shared between requests and must be treated as
+    read-only; callers copy before drawing on them (see ``edit_image``).
+    """
+    def __init__(self, max_bytes: int = DECODED_IMAGE_CACHE_BYTES_PER_PROCESS):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._images: "OrderedDict[str, Image.Image]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, design_id: str, image_bytes: Union[bytes, Callable[[], Optional[bytes]], None] = None) -> Optional[Image.Image]:
+        """Return the decoded image for ``design_id``, decoding ``image_bytes`` on a miss.
+
+        ``image_bytes`` may be a loader callable so hits never read the source.
+        """
+        with self._lock:
+            image = self._images.get(design_id)
+            if image is not None:
+                self._images.move_to_end(design_id)
+                self.hits += 1
+                return image
+            self.misses += 1
+
+        if callable(image_bytes):
+            image_bytes = image_bytes()
+        if image_bytes is None:
+            return None
+        image = Image.open(BytesIO(image_bytes)).convert('RGBA')
+        self.put(design_id, image)
+        return image
+
+    def put(self, design_id: str, image: Image.Image) -> None:
+        size = image_nbytes(image)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._images.pop(design_id, None)
+            if previous is not None:
+                self.current_bytes -= image_nbytes(previous)
+            self._images[design_id] = image
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes and self._images:
+                _, evicted = self._images.popitem(last=False)
+                self.current_bytes -= image_nbytes(evicted)
+
+    def invalidate(self, design_id: str) -> None:
+        with self._lock:
+            image = self._images.pop(design_id, None)
+            if image is not None:
+                self.current_bytes -= image_nbytes(image)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._images),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+decoded_images = DecodedImageCache()
@@ -1,91 +1,39 @@
-from PIL import Image, ImageEnhance, ImageDraw, ImageFont, ImageFilter
-import requests
+from PIL import Image, ImageDraw
 from io import BytesIO
 import os
 from dotenv import load_dotenv
-import io
-import time
-from typing import Tuple, Optional
+from functools import lru_cache
+from typing import Tuple
+from ai_agent.effects import apply_effects, parse_effects
+from ai_agent.fonts import get_font, font_registry
+from ai_agent.image_cache import decoded_images
+from ai_agent.blob_store import blob_store
+from ai_agent.encoding import encode_image
 
 load_dotenv()  # Load environment variables from .env file
 
-HUGGINGFACE_API_KEY = os.getenv("HUGGINGFACE_API_KEY")
-# Primary and fallback models
-PRIMARY_MODEL = "stabilityai/stable-diffusion-xl-base-1.0"
-FALLBACK_MODEL = "CompVis/stable-diffusion-v1-4"
-MAX_RETRIES = 3
-RETRY_DELAY = 2  # seconds
+# Distinct (size, text) placeholders kept rendered
+PLACEHOLDER_CACHE_SIZE = int(os.getenv("PLACEHOLDER_CACHE_SIZE", "32"))
 
-def generate_image(prompt: str, size: Tuple[int, int] = (512, 512)) -> Optional[bytes]:
-    """Generate image with fallback and retry mechanism"""
-    models = [PRIMARY_MODEL, FALLBACK_MODEL]
-    
-    for model in models:
-        API_URL = f"https://api-inference.huggingface.co/models/{model}"
-        headers = {
-            "Authorization": f"Bearer {HUGGINGFACE_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        
-        payload = {
-            "inputs": prompt,
-            "parameters": {
-                "negative_prompt": "low quality, blurry, bad art",
-                "num_inference_steps": 30,
-                "guidance_scale": 7.5,
-                "width": size[0],
-                "height": size[1]
-            }
-        }
-
-        for attempt in range(MAX_RETRIES):
-            try:
-                print(f"🎨 Trying model: {model} (attempt {attempt + 1})")
-                response = requests.post(API_URL, headers=headers, json=payload)
-                
-                if response.status_code == 200:
-                    print(f"✅ Successfully generated image with {model}")
-                    return response.content
-                
-                elif response.status_code == 503:
-                    print(f"⏳ Model {model} is loading (attempt {attempt + 1}/{MAX_RETRIES})")
-                    if attempt < MAX_RETRIES - 1:
-                        time.sleep(RETRY_DELAY * (attempt + 1))
-                    continue
-                
-                else:
-                    print(f"❌ Error with {model}: {response.status_code}")
-                    break  # Try next model
-                    
-            except Exception as e:
-                print(f"❌ Error during attempt {attempt + 1} with {model}: {str(e)}")
-                if attempt < MAX_RETRIES - 1:
-                    time.sleep(RETRY_DELAY)
-
-    # If all models fail, generate a placeholder
-    print("⚠️ All models failed, generating placeholder")
-    return generate_placeholder_image(size, prompt)
+def _gradient_background(size: Tuple[int, int]) -> Image:
+    """Build the placeholder gradient from a single column, then stretch it"""
+    width, height = size
+    column = bytearray()
+    for y in range(height):
+        column += bytes((
+            int(255 * (1 - y/height)),
+            int(200 * (1 - y/height)),
+            int(255 * (y/height)),
+        ))
+    return Image.frombytes('RGB', (1, height), bytes(column)).resize(size, Image.Resampling.NEAREST)
 
-def generate_placeholder_image(size: Tuple[int, int], text: str) -> bytes:
-    """Generate a placeholder image with text"""
-    # Create a new image with a gradient background
-    image = Image.new('RGB', size, color='white')
+@lru_cache(maxsize=PLACEHOLDER_CACHE_SIZE)
+def _render_placeholder(size: Tuple[int, int], text: str) -> bytes:
+    image = _gradient_background(size)
     draw = ImageDraw.Draw(image)
     
-    # Add a simple gradient
-    for y in range(size[1]):
-        r = int(255 * (1 - y/size[1]))
-        g = int(200 * (1 - y/size[1]))
-        b = int(255 * (y/size[1]))
-        for x in range(size[0]):
-            draw.point((x, y), fill=(r, g, b))
-    
     # Add text
-    try:
-        font = ImageFont.truetype("arial.ttf", 20)
-    except:
-        font = ImageFont.load_default()
-        
+    font = get_font(20)
     draw.text((size[0]/2, size[1]/2), "Image Generation Failed\n" + text, 
               font=font, fill='black', anchor="mm", align="center")
     
@@ -94,10 +42,35 @@ def generate_placeholder_image(size: Tuple[int, int], text: str) -> bytes:
     image.save(buffer, format='PNG')
     return buffer.getvalue()
 
-def edit_image(image_bytes: bytes, effect: str = None, text_overlay: str = None, text_style: dict = None, overlay_image: bytes = None, overlay_position: str = "center") -> bytes:
-    """Enhanced image editor with multiple effects and overlays"""
+def generate_placeholder_image(size: Tuple[int, int], text: str) -> bytes:
+    """Generate a placeholder image with text.
+
+    Rendered placeholders are cached per (size, text) so a burst of failed
+    generations during an outage only pays for rendering once.
+    """
+    return _render_placeholder(tuple(size), text)
+
+def edit_image(image_bytes: bytes = None, effect: str = None, text_overlay: str = None, text_style: dict = None, overlay_image: bytes = None, overlay_position: str = "center", design_id: str = None, image_hash: str = None) -> bytes:
+    """Enhanced image editor with multiple effects and overlays.
+
+    When ``design_id`` is given the decoded source comes from the shared
+    decoded-image cache; it is only copied if an edit would draw on it.
+    Instead of ``image_bytes`` the source may be named by its blob
+    ``image_hash``, which is only read from the blob store on a cache miss;
+    ``FileNotFoundError`` is raised if that blob is gone.
+    """
+    def load_source() -> bytes:
+        source = image_bytes if image_bytes is not None else blob_store.get(image_hash)
+        if source is None:
+            raise FileNotFoundError(f"Image {image_hash} is not in the blob store")
+        return source
+
     try:
-        image = Image.open(BytesIO(image_bytes)).convert('RGBA')
+        if design_id:
+            source = decoded_images.get(design_id, load_source)
+        else:
+            source = Image.open(BytesIO(load_source())).convert('RGBA')
+        image = source
         
         # 1. Apply visual effects
         if effect:
@@ -105,6 +78,8 @@ def edit_image(image_bytes: bytes, effect: str = None, text_overlay: str = None,
         
         # 2. Add text overlay with styling
         if text_overlay:
+            if image is source:
+                image = image.copy()
             image = add_styled_text(image, text_overlay, text_style or {})
             
         # 3. Add image overlay if provided
@@ -113,41 +88,21 @@ def edit_image(image_bytes: bytes, effect: str = None, text_overlay: str = None,
             image = compose_images(image, overlay, overlay_position)
             
         # Convert and return
-        output = BytesIO()
-        image.save(output, format='PNG')
-        return output.getvalue()
+        return encode_image(image, "png")
         
+    except FileNotFoundError:
+        raise
     except Exception as e:
         print(f"Edit error: {str(e)}")
-        return image_bytes
+        return load_source()
 
 def apply_effect(image: Image, effect: str) -> Image:
-    """Apply visual effects to image"""
-    if effect == "vintage":
-        # Sepia tone
-        width, height = image.size
-        img = image.copy()
-        for x in range(width):
-            for y in range(height):
-                r, g, b = img.getpixel((x, y))[:3]
-                tr = int(0.393 * r + 0.769 * g + 0.189 * b)
-                tg = int(0.349 * r + 0.686 * g + 0.168 * b)
-                tb = int(0.272 * r + 0.534 * g + 0.131 * b)
-                img.putpixel((x, y), (min(tr, 255), min(tg, 255), min(tb, 255), 255))
-        return img
-        
-    elif effect == "bright":
-        enhancer = ImageEnhance.Brightness(image)
-        return enhancer.enhance(1.3)
-        
-    elif effect == "contrast":
-        enhancer = ImageEnhance.Contrast(image)
-        return enhancer.enhance(1.5)
-        
-    elif effect == "blur":
-        return image.filter(ImageFilter.GaussianBlur(radius=2))
-        
-    return image
+    """Apply visual effects to image.
+
+    ``effect`` is a registered effect name or a chain such as
+    ``"vintage+blur"``; see ``ai_agent.effects`` for the registry.
+    """
+    return apply_effects(image, parse_effects(effect))
 
 def add_styled_text(image: Image, text: str, style: dict) -> Image:
     """Add styled text to image"""
@@ -159,10 +114,7 @@ def add_styled_text(image: Image, text: str, style: dict) -> Image:
     position = style.get('position', 'bottom')
     outline = style.get('outline', True)
     
-    try:
-        font = ImageFont.truetype("arial.ttf", font_size)
-    except:
-        font = ImageFont.load_default()
+    font = get_font(font_size, style.get('font'), style.get('style', 'normal'))
     
     # Calculate text position
     text_bbox = draw.textbbox((0, 0), text, font=font)
@@ -232,6 +184,10 @@ def compose_images(base_image: Image, overlay_image: Image, position: str = "cen
         print(f"Error composing images: {str(e)}")
         return base_image
 
+def worker_cache_stats() -> dict:
+    """Counters of this process's decoded-image and font caches"""
+    return {"decoded_images": decoded_images.stats(), "fonts": font_registry.stats()}
+
 def get_image_dimensions(image_bytes: bytes) -> Tuple[int, int]:
     """Get image dimensions"""
     try:
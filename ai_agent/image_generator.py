@@ -1,5 +1,10 @@
 import os
-import requests
+import time
+from typing import Dict, Optional, Tuple, Union
+from ai_agent.http_client import post_with_retry, inference_url
+from ai_agent.generation_cache import generation_cache
+from ai_agent.model_router import ModelRouter
+from ai_agent.hedging import Hedger
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -18,41 +23,142 @@ if not HUGGINGFACE_API_KEY:
     HUGGINGFACE_API_KEY = None
 
 STABLE_DIFFUSION_MODEL = os.getenv("STABLE_DIFFUSION_MODEL", "runwayml/stable-diffusion-v1-5")
-API_URL = f"https://api-inference.huggingface.co/models/{STABLE_DIFFUSION_MODEL}"
+# Tried in order when the primary model fails or its circuit is open (comma separated)
+IMAGE_FALLBACK_MODELS = os.getenv("IMAGE_FALLBACK_MODELS", "CompVis/stable-diffusion-v1-4")
+IMAGE_MODELS = list(dict.fromkeys(
+    [STABLE_DIFFUSION_MODEL] + [model.strip() for model in IMAGE_FALLBACK_MODELS.split(",") if model.strip()]
+))
+MAX_RETRIES = 3
+RETRY_DELAY = 2  # seconds
+# Hedging: if the first model is slower than its usual latency percentile,
+# race a second request (fallback model, or the same one again) against it
+IMAGE_HEDGING = os.getenv("IMAGE_HEDGING", "false").lower() in ("1", "true", "yes")
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+HEDGE_DEFAULT_DELAY = float(os.getenv("HEDGE_DEFAULT_DELAY", "20"))  # seconds, until latencies are known
 
-def generate_image(prompt: str, size: str) -> bytes:
+NEGATIVE_PROMPT = "low quality, blurry, bad art"
+
+def _headers() -> dict:
+    return {
+        "Authorization": f"Bearer {HUGGINGFACE_API_KEY}",
+        "Content-Type": "application/json"
+    }
+
+def parse_size(size: Union[str, Tuple[int, int]]) -> Tuple[int, int]:
+    if isinstance(size, str):
+        width, height = size.lower().split("x", 1)
+        return int(width), int(height)
+    return int(size[0]), int(size[1])
+
+async def _request_model(model: str, prompt: str, size: Tuple[int, int], max_retries: int) -> Optional[bytes]:
+    """One model's attempt at the image; the outcome feeds the router's health stats"""
+    payload = {
+        "inputs": prompt,
+        "parameters": {
+            "negative_prompt": NEGATIVE_PROMPT,
+            "num_inference_steps": 30,
+            "guidance_scale": 7.5,
+            "width": size[0],
+            "height": size[1]
+        }
+    }
+
+    print(f"🎨 Trying model: {model}")
+    started = time.monotonic()
+    response = await post_with_retry(
+        inference_url(model), headers=_headers(), json=payload,
+        max_retries=max_retries, retry_delay=RETRY_DELAY, label=model
+    )
+
+    if response is not None and response.status_code == 200:
+        image_router.record(model, True, time.monotonic() - started)
+        print(f"✅ Successfully generated image with {model}")
+        return response.content
+
+    # Client errors (bad prompt, auth) say nothing about the model's health
+    if response is None or response.status_code == 429 or response.status_code >= 500:
+        image_router.record(model, False)
+    if response is not None and response.status_code == 401:
+        print("❌ Authentication failed. Please check your API key.")
+    print(f"❌ Error with {model}: {response.status_code if response is not None else 'no response'}")
+    return None
+
+async def _probe_model(model: str) -> bool:
+    """Cheap single-step generation used to check whether an open circuit can close"""
+    response = await post_with_retry(
+        inference_url(model), headers=_headers(),
+        json={"inputs": "probe", "parameters": {"num_inference_steps": 1, "width": 256, "height": 256}},
+        max_retries=1, label=f"{model} probe"
+    )
+    return response is not None and response.status_code == 200
+
+image_router = ModelRouter(IMAGE_MODELS, probe=_probe_model)
+image_hedger = Hedger()
+
+async def _attempt(model: str, prompt: str, size: Tuple[int, int], tried: set) -> Optional[Tuple[str, bytes]]:
+    tried.add(model)
+    image_bytes = await _request_model(model, prompt, size, max_retries=1)
+    return (model, image_bytes) if image_bytes is not None else None
+
+async def _hedged_generate(models: list, prompt: str, size: Tuple[int, int], tried: set) -> Optional[Tuple[str, bytes]]:
+    primary = models[0]
+    backup = models[1] if len(models) > 1 else primary
+    delay = image_router.latency_percentile(primary, HEDGE_PERCENTILE) or HEDGE_DEFAULT_DELAY
+    return await image_hedger.run(
+        lambda: _attempt(primary, prompt, size, tried),
+        lambda: _attempt(backup, prompt, size, tried),
+        delay
+    )
+
+def cache_keys(prompt: str, size: Tuple[int, int]) -> Dict[str, str]:
+    """Generation cache key of this request for every routed model"""
+    return {
+        model: generation_cache.key(model, prompt, NEGATIVE_PROMPT, 30, 7.5, size)
+        for model in image_router.models
+    }
+
+async def generate_image(prompt: str, size: Union[str, Tuple[int, int]] = (512, 512), use_cache: bool = True) -> Optional[bytes]:
+    """Generate an image with the configured models; None if every model fails.
+
+    A cached image from any of the models is reused. Models with an open
+    circuit are skipped, and every model except the last healthy one gets
+    a single attempt so a failing primary hands over to the fallback
+    without waiting through retries. With IMAGE_HEDGING on, a slow first
+    request is raced against a backup; if both fail, the remaining models
+    are tried as usual and the last one still gets its retries.
+    """
     try:
+        size = parse_size(size)
+        keys = cache_keys(prompt, size)
+        for model, cache_key in keys.items():
+            cached = generation_cache.get(cache_key, use_cache)
+            if cached is not None:
+                print(f"♻️ Reusing cached image from {model}")
+                return cached
+
         if not HUGGINGFACE_API_KEY:
-            # Return a placeholder image or error response
             return None
 
-        headers = {
-            "Authorization": f"Bearer {HUGGINGFACE_API_KEY}"
-        }
-        
-        payload = {
-            "inputs": prompt,
-            "parameters": {
-                "size": size
-            }
-        }
-        
-        print(f"🎨 Generating image with model: {STABLE_DIFFUSION_MODEL}")
-        print(f"🔑 Using API key: {HUGGINGFACE_API_KEY[:10]}...")
         print(f"📝 Prompt: {prompt}")
-        
-        response = requests.post(API_URL, headers=headers, json=payload)
-        print(f"📡 Response Status: {response.status_code}")
-        
-        if response.status_code == 200:
-            return response.content
-        elif response.status_code == 401:
-            print("❌ Authentication failed. Please check your API key.")
-            return None
-        else:
-            print(f"❌ Error: {response.text}")
-            return None
+        models = image_router.available()
+        if IMAGE_HEDGING and models:
+            tried = set()
+            winner = await _hedged_generate(models, prompt, size, tried)
+            if winner is not None:
+                model, image_bytes = winner
+                generation_cache.put(keys[model], image_bytes, use_cache)
+                return image_bytes
+            # The last model keeps its full retry budget even if it was hedged with
+            models = [model for model in models if model not in tried or model == models[-1]]
+
+        for index, model in enumerate(models):
+            max_retries = MAX_RETRIES if index == len(models) - 1 else 1
+            image_bytes = await _request_model(model, prompt, size, max_retries)
+            if image_bytes is not None:
+                generation_cache.put(keys[model], image_bytes, use_cache)
+                return image_bytes
+        return None
             
     except Exception as e:
         print(f"❌ Error generating image: {str(e)}")
-        return None 
\ No newline at end of file
+        return None
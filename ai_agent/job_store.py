@@ -0,0 +1,119 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from typing import Any, List, Optional
+
+# SQLite file shared by every app process on the host; Vercel only allows writes under /tmp
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", os.path.join(tempfile.gettempdir(), "ai-photos-jobs.sqlite3"))
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", str(24 * 3600)))  # seconds finished jobs are kept
+# Unfinished jobs whose owning process has not checked in for this long are failed
+JOB_STALE_AFTER = float(os.getenv("JOB_STALE_AFTER", "60"))  # seconds
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED = (SUCCEEDED, FAILED)
+STALE_ERROR = "Job was lost when its worker stopped"
+
+class JobStore:
+    """Job status, progress and results in a local SQLite database.
+
+    Any process can read a job, so a client may poll or subscribe through
+    a different worker than the one running it. ``params`` and ``result``
+    are stored as JSON. The process holding a job refreshes its
+    ``heartbeat_at``; queued or running jobs without a heartbeat for
+    ``stale_after`` seconds (their process died) are reported as failed
+    by ``get`` and marked failed by ``fail_stale``, which runs on job
+    creation and with every heartbeat, so reads never write.
+    """
+    def __init__(self, path: str = JOB_STORE_PATH, retention: float = JOB_RETENTION, stale_after: float = JOB_STALE_AFTER):
+        self.path = path
+        self.retention = retention
+        self.stale_after = stale_after
+        self._local = threading.local()
+        db = self._db()
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, kind TEXT, status TEXT, progress REAL, "
+            "params TEXT, result TEXT, error TEXT, created_at REAL, updated_at REAL, heartbeat_at REAL)"
+        )
+        try:
+            db.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at REAL")
+        except sqlite3.OperationalError:
+            pass  # column already present
+
+    def _db(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            self._local.db = db
+        return db
+
+    def create(self, kind: str, params: dict) -> str:
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        db = self._db()
+        db.execute(
+            "INSERT INTO jobs (id, kind, status, progress, params, created_at, updated_at, heartbeat_at) VALUES (?, ?, ?, 0, ?, ?, ?, ?)",
+            (job_id, kind, QUEUED, json.dumps(params), now, now, now),
+        )
+        self.fail_stale()
+        db.execute("DELETE FROM jobs WHERE updated_at < ? AND status IN (?, ?)", (now - self.retention, *FINISHED))
+        return job_id
+
+    def heartbeat(self, job_ids: List[str]) -> None:
+        """Mark jobs as still owned by a live process"""
+        if not job_ids:
+            return
+        placeholders = ", ".join("?" for _ in job_ids)
+        self._db().execute(f"UPDATE jobs SET heartbeat_at = ? WHERE id IN ({placeholders})", (time.time(), *job_ids))
+
+    def fail_stale(self, job_id: Optional[str] = None) -> None:
+        """Fail unfinished jobs (or just ``job_id``) whose process stopped sending heartbeats"""
+        now = time.time()
+        query = (
+            "UPDATE jobs SET status = ?, error = ?, updated_at = ? "
+            "WHERE status IN (?, ?) AND COALESCE(heartbeat_at, updated_at) < ?"
+        )
+        args = [FAILED, STALE_ERROR, now, QUEUED, RUNNING, now - self.stale_after]
+        if job_id is not None:
+            query += " AND id = ?"
+            args.append(job_id)
+        self._db().execute(query, args)
+
+    def update(self, job_id: str, status: Optional[str] = None, progress: Optional[float] = None, result: Any = None, error: Optional[str] = None) -> None:
+        fields = {"updated_at": time.time()}
+        if status is not None:
+            fields["status"] = status
+        if progress is not None:
+            fields["progress"] = progress
+        if result is not None:
+            fields["result"] = json.dumps(result)
+        if error is not None:
+            fields["error"] = error
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        self._db().execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def get(self, job_id: str) -> Optional[dict]:
+        row = self._db().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        if job["status"] not in FINISHED and (job["heartbeat_at"] or job["updated_at"]) < time.time() - self.stale_after:
+            job.update(status=FAILED, error=STALE_ERROR)
+        job["params"] = json.loads(job["params"]) if job["params"] else {}
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def stats(self) -> dict:
+        rows = self._db().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+job_store = JobStore()
@@ -0,0 +1,171 @@
+import asyncio
+import functools
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set
+from ai_agent.job_store import JobStore, job_store, RUNNING, SUCCEEDED, FAILED, FINISHED
+
+# Background generation: workers per process and jobs allowed to wait for one
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+# How often this process confirms it still holds its queued and running jobs
+JOB_HEARTBEAT_INTERVAL = float(os.getenv("JOB_HEARTBEAT_INTERVAL", "15"))  # seconds
+# How often job event streams check the job store, and send a keep-alive
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "0.5"))
+JOB_KEEPALIVE_INTERVAL = float(os.getenv("JOB_KEEPALIVE_INTERVAL", "15"))
+
+# progress(fraction, partial_result=None) lets a handler report how far it got
+Progress = Callable[..., None]
+Handler = Callable[[dict, Progress], Awaitable[Any]]
+
+class JobQueue:
+    """Bounded in-process queue feeding a pool of async workers.
+
+    ``submit`` records the job in the shared ``JobStore`` and returns its
+    id at once; it raises ``asyncio.QueueFull`` when ``max_size`` jobs are
+    already waiting, so callers can shed load instead of piling up.
+    Workers run the handler registered for the job's kind and write
+    progress, the result or the error back to the store. While jobs are
+    held here a heartbeat task keeps them fresh in the store, so jobs
+    orphaned by a crashed process are failed instead of hanging.
+    Store writes run in order on a single background thread, never on
+    the event loop.
+    """
+    def __init__(self, store: JobStore = job_store, workers: int = JOB_WORKERS, max_size: int = JOB_QUEUE_SIZE):
+        self.store = store
+        self.workers = workers
+        self.max_size = max_size
+        self.handlers: Dict[str, Handler] = {}
+        self.submitted = 0
+        self.rejected = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._held: Set[str] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._creating = 0
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="job-store")
+
+    def register(self, kind: str, handler: Handler) -> None:
+        self.handlers[kind] = handler
+
+    def _ensure_workers(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._queue is None or self._loop is not loop:
+            self._queue = asyncio.Queue(maxsize=self.max_size)
+            self._tasks = [loop.create_task(self._work()) for _ in range(self.workers)]
+            self._tasks.append(loop.create_task(self._heartbeat()))
+            self._loop = loop
+        return self._queue
+
+    async def _write(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run a store write on the writer thread, after every write queued before it"""
+        return await asyncio.get_running_loop().run_in_executor(self._writer, functools.partial(fn, *args, **kwargs))
+
+    def _report_progress(self, job_id: str, fraction: float, partial: Any = None) -> None:
+        """Queue a progress write without waiting for it; failures are only logged"""
+        def write():
+            try:
+                self.store.update(job_id, progress=fraction, result=partial)
+            except Exception as e:
+                print(f"⚠️ Could not record progress of job {job_id}: {str(e)}")
+        self._writer.submit(write)
+
+    async def submit(self, kind: str, params: dict) -> str:
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        queue = self._ensure_workers()
+        # Count jobs still being written so concurrent submits cannot overfill the queue
+        if queue.qsize() + self._creating >= self.max_size:
+            self.rejected += 1
+            raise asyncio.QueueFull()
+        self._creating += 1
+        try:
+            job_id = await self._write(self.store.create, kind, params)
+        finally:
+            self._creating -= 1
+        queue.put_nowait((job_id, kind, params))
+        self._held.add(job_id)
+        self.submitted += 1
+        return job_id
+
+    async def _work(self) -> None:
+        while True:
+            job_id, kind, params = await self._queue.get()
+            try:
+                await self._write(self.store.update, job_id, status=RUNNING)
+                progress = functools.partial(self._report_progress, job_id)
+                result = await self.handlers[kind](params, progress)
+                await self._write(self.store.update, job_id, status=SUCCEEDED, progress=1.0, result=result)
+            except asyncio.CancelledError:
+                await self._write(self.store.update, job_id, status=FAILED, error="Server shutting down")
+                raise
+            except Exception as e:
+                print(f"❌ Job {job_id} ({kind}) failed: {str(e)}")
+                await self._write(self.store.update, job_id, status=FAILED, error=str(e))
+            finally:
+                self._held.discard(job_id)
+                self._queue.task_done()
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(JOB_HEARTBEAT_INTERVAL)
+            try:
+                await self._write(self.store.heartbeat, list(self._held))
+                await self._write(self.store.fail_stale)
+            except Exception as e:
+                print(f"⚠️ Job heartbeat failed: {str(e)}")
+
+    async def shutdown(self) -> None:
+        """Stop the workers; queued jobs are marked failed so pollers stop waiting"""
+        if self._loop is not asyncio.get_running_loop():
+            return
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        while not self._queue.empty():
+            job_id, _, _ = self._queue.get_nowait()
+            await self._write(self.store.update, job_id, status=FAILED, error="Server shutting down")
+        self._tasks = []
+        self._held.clear()
+        self._queue = None
+        self._loop = None
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "max_queued": self.max_size,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "jobs_by_status": self.store.stats(),
+        }
+
+job_queue = JobQueue()
+
+async def job_events(job_id: str, present: Callable[[dict], dict], store: JobStore = job_store, poll_interval: float = JOB_POLL_INTERVAL, keepalive_interval: float = JOB_KEEPALIVE_INTERVAL) -> AsyncIterator[str]:
+    """Server-sent events for a job: ``progress`` on each change, then ``succeeded`` or ``failed``.
+
+    A change is a new status or update time, so a job the store only
+    reports as failed (its worker died) still ends the stream.
+    """
+    loop = asyncio.get_running_loop()
+    last_seen = None
+    last_sent = loop.time()
+    while True:
+        job = await asyncio.to_thread(store.get, job_id)
+        if job is None:
+            yield f"event: failed\ndata: {json.dumps({'job_id': job_id, 'error': 'Job expired'})}\n\n"
+            return
+        if (job["status"], job["updated_at"]) != last_seen:
+            last_seen = (job["status"], job["updated_at"])
+            finished = job["status"] in FINISHED
+            yield f"event: {job['status'] if finished else 'progress'}\ndata: {json.dumps(present(job))}\n\n"
+            if finished:
+                return
+            last_sent = loop.time()
+        elif loop.time() - last_sent >= keepalive_interval:
+            # Comment line so proxies do not close an idle stream
+            yield ": keep-alive\n\n"
+            last_sent = loop.time()
+        await asyncio.sleep(poll_interval)
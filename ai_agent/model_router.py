@@ -0,0 +1,144 @@
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional
+
+# A model whose recent error rate reaches the threshold stops receiving traffic
+MODEL_ERROR_THRESHOLD = float(os.getenv("MODEL_ERROR_THRESHOLD", "0.5"))
+MODEL_MIN_SAMPLES = int(os.getenv("MODEL_MIN_SAMPLES", "3"))  # calls needed before judging a model
+MODEL_HEALTH_WINDOW = int(os.getenv("MODEL_HEALTH_WINDOW", "20"))  # recent calls considered
+MODEL_OPEN_SECONDS = float(os.getenv("MODEL_OPEN_SECONDS", "30"))  # wait before probing a failed model
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class ModelHealth:
+    """Recent outcomes and latencies of one model plus its circuit state"""
+    def __init__(self, window: int):
+        self.outcomes = deque(maxlen=window)
+        self.latencies = deque(maxlen=window)  # successful calls only
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.calls = 0
+        self.failures = 0
+        self.probe_task: Optional[asyncio.Task] = None
+        self.trial_at: Optional[float] = None  # when a half-open model was last handed out
+
+    def error_rate(self) -> float:
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def latency_percentile(self, pct: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state,
+            "calls": self.calls,
+            "failures": self.failures,
+            "error_rate": round(self.error_rate(), 3),
+            "p50_latency": self.latency_percentile(50),
+            "p95_latency": self.latency_percentile(95),
+        }
+
+class ModelRouter:
+    """Orders candidate models by health, with a circuit breaker per model.
+
+    Models are tried in their configured priority order, skipping any
+    whose circuit is open. A circuit opens when the recent error rate
+    reaches ``error_threshold``; after ``open_seconds`` the ``probe``
+    coroutine is run in the background until the model answers again,
+    and the circuit stays open while it does. Without a probe, one real
+    request after the cooldown is the trial; other callers skip the model
+    until it reports back (or ``open_seconds`` pass without an outcome).
+    """
+    def __init__(
+        self,
+        models: List[str],
+        probe: Optional[Callable[[str], Awaitable[bool]]] = None,
+        error_threshold: float = MODEL_ERROR_THRESHOLD,
+        min_samples: int = MODEL_MIN_SAMPLES,
+        window: int = MODEL_HEALTH_WINDOW,
+        open_seconds: float = MODEL_OPEN_SECONDS,
+    ):
+        self.models = list(models)
+        self.probe = probe
+        self.error_threshold = error_threshold
+        self.min_samples = min_samples
+        self.open_seconds = open_seconds
+        self.health: Dict[str, ModelHealth] = {model: ModelHealth(window) for model in self.models}
+
+    def available(self) -> List[str]:
+        """Models to try, in order; empty when every circuit is open"""
+        now = time.monotonic()
+        models = []
+        for model in self.models:
+            health = self.health[model]
+            if health.state == OPEN and health.probe_task is None and now - health.opened_at >= self.open_seconds:
+                health.state = HALF_OPEN
+                health.trial_at = None
+            if health.state == OPEN:
+                continue
+            if health.state == HALF_OPEN:
+                if health.trial_at is not None and now - health.trial_at < self.open_seconds:
+                    continue
+                health.trial_at = now
+            models.append(model)
+        return models
+
+    def record(self, model: str, ok: bool, latency: Optional[float] = None) -> None:
+        health = self.health[model]
+        health.calls += 1
+        health.outcomes.append(ok)
+        health.trial_at = None
+        if ok:
+            if latency is not None:
+                health.latencies.append(latency)
+            if health.state != CLOSED:
+                print(f"✅ {model} recovered, closing circuit")
+                health.state = CLOSED
+                health.outcomes.clear()
+            return
+
+        health.failures += 1
+        if health.state == HALF_OPEN or (
+            health.state == CLOSED
+            and len(health.outcomes) >= self.min_samples
+            and health.error_rate() >= self.error_threshold
+        ):
+            self._open(model)
+
+    def _open(self, model: str) -> None:
+        health = self.health[model]
+        health.state = OPEN
+        health.opened_at = time.monotonic()
+        print(f"🔌 Opening circuit for {model} (error rate {health.error_rate():.0%})")
+        if self.probe is not None and (health.probe_task is None or health.probe_task.done()):
+            try:
+                health.probe_task = asyncio.get_running_loop().create_task(self._probe_until_closed(model))
+            except RuntimeError:
+                # No event loop to probe from; fall back to a trial request after the cooldown
+                health.probe_task = None
+
+    async def _probe_until_closed(self, model: str) -> None:
+        health = self.health[model]
+        while health.state != CLOSED:
+            await asyncio.sleep(self.open_seconds)
+            # The circuit stays open until the probe itself succeeds
+            try:
+                ok = await self.probe(model)
+            except Exception as e:
+                print(f"❌ Probe of {model} failed: {str(e)}")
+                ok = False
+            # Probes are deliberately cheap, so their latency is not recorded
+            self.record(model, ok)
+
+    def latency_percentile(self, model: str, pct: float) -> Optional[float]:
+        return self.health[model].latency_percentile(pct)
+
+    def stats(self) -> dict:
+        return {model: health.snapshot() for model, health in self.health.items()}
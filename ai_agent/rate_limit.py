@@ -0,0 +1,50 @@
+import asyncio
+import os
+import time
+from typing import Dict
+
+# Default request rate allowed per upstream model
+MODEL_RATE_LIMIT = float(os.getenv("MODEL_RATE_LIMIT", "2"))  # requests per second
+MODEL_RATE_BURST = int(os.getenv("MODEL_RATE_BURST", "5"))
+
+class RateLimiter:
+    """Async token bucket: ``rate`` tokens per second, up to ``burst`` saved up"""
+    def __init__(self, rate: float = MODEL_RATE_LIMIT, burst: int = MODEL_RATE_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = None
+        self._loop = None
+
+    def _get_lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._loop is not loop:
+            self._lock = asyncio.Lock()
+            self._loop = loop
+        return self._lock
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> None:
+        """Wait until a request may be sent"""
+        if self.rate <= 0:
+            return
+        async with self._get_lock():
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+_limiters: Dict[str, RateLimiter] = {}
+
+def model_rate_limiter(model: str) -> RateLimiter:
+    """Shared limiter for one upstream model"""
+    limiter = _limiters.get(model)
+    if limiter is None:
+        limiter = _limiters[model] = RateLimiter()
+    return limiter
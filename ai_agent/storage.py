@@ -1,5 +1,5 @@
 import os
-import requests
+from ai_agent.http_client import get_client
 from dotenv import load_dotenv
 import time
 from sqlalchemy import create_engine
@@ -27,7 +27,7 @@ def create_db_engine():
             time.sleep(2)  # Wait before retrying
     raise Exception("Max retries exceeded while trying to connect to the database.")
 
-def upload_to_supabase(image: bytes, metadata: dict) -> str:
+async def upload_to_supabase(image: bytes, metadata: dict) -> str:
     # Upload image to Supabase storage
     headers = {
         "Authorization": f"Bearer {SUPABASE_API_KEY}",
@@ -35,15 +35,15 @@ def upload_to_supabase(image: bytes, metadata: dict) -> str:
     }
     
     # Upload the image
-    response = requests.post(
+    response = await get_client().post(
         f"{SUPABASE_URL}/storage/v1/object/{SUPABASE_BUCKET}/image.png",  # Adjust the path as needed
         headers=headers,
-        data=image
+        content=image
     )
     
     if response.status_code == 200:
         # Store metadata in Supabase database
-        metadata_response = requests.post(
+        metadata_response = await get_client().post(
             f"{SUPABASE_URL}/rest/v1/your_table_name",  # Replace with your table name
             headers={
                 "Authorization": f"Bearer {SUPABASE_API_KEY}",
@@ -59,13 +59,13 @@ def upload_to_supabase(image: bytes, metadata: dict) -> str:
     else:
         return "Error uploading image"
 
-def download_from_supabase(image_id: str, format: str) -> bytes:
+async def download_from_supabase(image_id: str, format: str) -> bytes:
     # Download image from Supabase storage
     headers = {
         "Authorization": f"Bearer {SUPABASE_API_KEY}"
     }
     
-    response = requests.get(
+    response = await get_client().get(
         f"{SUPABASE_URL}/storage/v1/object/public/{SUPABASE_BUCKET}/{image_id}.{format}",  # Adjust the path as needed
         headers=headers
     )
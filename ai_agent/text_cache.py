@@ -0,0 +1,107 @@
+import json
+import os
+import tempfile
+import time
+from typing import Hashable, Iterable, Optional, Tuple
+from ai_agent.cache import LRUCache
+
+# Generated copy per (model, event_type, theme, component)
+TEXT_CACHE_SIZE = int(os.getenv("TEXT_CACHE_SIZE", "2048"))  # keys
+TEXT_CACHE_TTL = float(os.getenv("TEXT_CACHE_TTL", str(24 * 3600)))  # seconds
+TEXT_CACHE_VARIANTS = int(os.getenv("TEXT_CACHE_VARIANTS", "3"))  # texts kept per key
+# Keys are served once they hold this many distinct variants or have been
+# generated this many times, so a model that keeps returning the same copy
+# still gets cached
+TEXT_CACHE_MIN_VARIANTS = int(os.getenv("TEXT_CACHE_MIN_VARIANTS", str(TEXT_CACHE_VARIANTS)))
+# Snapshot written by the precompute job and loaded at startup
+TEXT_CACHE_FILE = os.getenv("TEXT_CACHE_FILE", os.path.join(tempfile.gettempdir(), "ai-photos-text-cache.json"))
+
+class TextCache(LRUCache):
+    """Several generated variants per key, served in rotation.
+
+    Each key holds up to ``variants`` distinct texts (oldest dropped
+    first); ``pick`` returns them round-robin so repeat visitors do not
+    always see the same copy. A key is served once it has
+    ``min_variants`` distinct texts or that many generations, whichever
+    comes first. Keys expire ``ttl`` seconds after their last new variant.
+    """
+    def __init__(self, max_items: int = TEXT_CACHE_SIZE, ttl: float = TEXT_CACHE_TTL, variants: int = TEXT_CACHE_VARIANTS, min_variants: int = TEXT_CACHE_MIN_VARIANTS):
+        super().__init__(max_items=max_items, ttl=ttl)
+        self.variants = variants
+        self.min_variants = min(min_variants, variants)
+
+    @staticmethod
+    def key(model: str, event_type: str, theme: str, component: str) -> Tuple[str, str, str, str]:
+        return (model, event_type.strip().lower(), theme.strip().lower(), component)
+
+    def _peek(self, key: Hashable) -> Optional[dict]:
+        """Live value for ``key`` without counting a hit or miss; call with the lock held"""
+        entry = self._entries.get(key)
+        if entry is None or (self.ttl is not None and time.monotonic() - entry[2] > self.ttl):
+            return None
+        return entry[0]
+
+    def _servable(self, value: Optional[dict]) -> bool:
+        return value is not None and max(len(value["texts"]), value["attempts"]) >= self.min_variants
+
+    def ready(self, model: str, event_type: str, theme: str, component: str) -> bool:
+        """True once a live key holds enough variants to be served"""
+        with self._lock:
+            return self._servable(self._peek(self.key(model, event_type, theme, component)))
+
+    def pick(self, model: str, event_type: str, theme: str, component: str) -> Optional[str]:
+        value = self.get(self.key(model, event_type, theme, component))
+        with self._lock:
+            if not self._servable(value):
+                return None
+            texts = value["texts"]
+            text = texts[0]
+            texts.append(texts.pop(0))
+            return text
+
+    def add(self, model: str, event_type: str, theme: str, component: str, text: str) -> None:
+        self._merge(self.key(model, event_type, theme, component), [text], attempts=1)
+
+    def _merge(self, key: Hashable, new_texts: Iterable[str], attempts: int) -> None:
+        with self._lock:
+            value = self._peek(key) or {"texts": [], "attempts": 0}
+            texts = list(value["texts"])
+            seen = value["attempts"]
+        for text in new_texts:
+            texts = [variant for variant in texts if variant != text] + [text]
+        self.put(key, {"texts": texts[-self.variants:], "attempts": seen + attempts})
+
+    def save(self, path: str = TEXT_CACHE_FILE) -> int:
+        """Write every live entry to ``path``; returns the number of keys saved"""
+        with self._lock:
+            live = [(key, self._peek(key)) for key in self._entries]
+            entries = [
+                {"key": list(key), "variants": list(value["texts"]), "attempts": value["attempts"]}
+                for key, value in live if value is not None
+            ]
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, path)
+        return len(entries)
+
+    def load(self, path: str = TEXT_CACHE_FILE) -> int:
+        """Merge a snapshot written by ``save``; returns the number of keys loaded"""
+        try:
+            with open(path) as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Could not load text cache from {path}: {str(e)}")
+            return 0
+        for entry in entries:
+            texts = entry["variants"]
+            self._merge(self.key(*entry["key"]), texts, attempts=entry.get("attempts", len(texts)))
+        return len(entries)
+
+    def stats(self) -> dict:
+        return {**super().stats(), "variants_per_key": self.variants}
+
+text_cache = TextCache()
+text_cache.load()
@@ -1,9 +1,13 @@
+import asyncio
 import os
-import requests
 import json
-import time
+import re
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
 from dotenv import load_dotenv
 from pathlib import Path
+import httpx
+from ai_agent.http_client import get_client, post_with_retry, inference_url
+from ai_agent.text_cache import text_cache, TEXT_CACHE_FILE, TEXT_CACHE_VARIANTS
 
 # Load environment variables
 load_dotenv()
@@ -20,19 +24,51 @@ if not HUGGINGFACE_API_KEY:
 
 # Get model name from environment or use default
 HUGGINGFACE_MODEL = os.getenv("HUGGINGFACE_TEXT_MODEL", "gpt2")
-API_URL = f"https://api-inference.huggingface.co/models/{HUGGINGFACE_MODEL}"
+API_URL = inference_url(HUGGINGFACE_MODEL)
 
-def generate_creative_text(prompt: str, max_retries: int = 3) -> dict:
-    """Helper function to generate creative text with retries"""
+# Headline, tagline and description are generated concurrently and must all
+# be back within TEXT_DEADLINE seconds; late components use fallback copy.
+TEXT_DEADLINE = float(os.getenv("TEXT_DEADLINE", "20"))
+# Ask for all three components in one structured prompt instead of three
+TEXT_STRUCTURED = os.getenv("TEXT_STRUCTURED", "false").lower() in ("1", "true", "yes")
+
+COMPONENTS = ("headline", "tagline", "description")
+STRUCTURED_LINE = re.compile(r"^\s*(headline|tagline|description)\s*:\s*(.+?)\s*$", re.IGNORECASE | re.MULTILINE)
+
+def component_prompts(event_type: str, theme: str) -> Dict[str, str]:
+    return {
+        "headline": f"Create a catchy headline for a {event_type} with the theme '{theme}':",
+        "tagline": f"Write a creative tagline for a {theme}-themed {event_type}:",
+        "description": f"Write a short description for a {theme}-themed {event_type}:",
+    }
+
+def structured_prompt(event_type: str, theme: str) -> str:
+    return (
+        f"Write promotional copy for a {theme}-themed {event_type} in exactly this format:\n"
+        "Headline: <catchy headline>\n"
+        "Tagline: <creative tagline>\n"
+        "Description: <short description>\n\n"
+        "Headline:"
+    )
+
+def fallback_text(event_type: str, theme: str) -> Dict[str, str]:
+    return {
+        "headline": f"🎯 {theme.title()} {event_type}",
+        "tagline": f"Experience the magic of {theme}",
+        "description": f"Join us for an unforgettable {event_type} experience themed around {theme}.",
+    }
+
+def parse_structured_text(text: str) -> Dict[str, str]:
+    """Pull ``Headline:``/``Tagline:``/``Description:`` lines out of a completion"""
+    fields = {}
+    for name, value in STRUCTURED_LINE.findall(text):
+        fields.setdefault(name.lower(), value)
+    return fields
+
+async def generate_creative_text(prompt: str, max_retries: int = 3, max_length: int = 150) -> Optional[str]:
+    """Helper function to generate creative text with retries; None if it failed"""
     if not HUGGINGFACE_API_KEY:
-        return {
-            "generated_text": {
-                "headline": f"Sample Headline for {prompt}",
-                "tagline": f"Sample Tagline for {prompt}",
-                "description": f"Sample Description for {prompt}",
-                "error": "HUGGINGFACE_API_KEY not configured"
-            }
-        }
+        return None
 
     headers = {
         "Authorization": f"Bearer {HUGGINGFACE_API_KEY}",
@@ -42,86 +78,224 @@ def generate_creative_text(prompt: str, max_retries: int = 3) -> dict:
     payload = {
         "inputs": prompt,
         "parameters": {
-            "max_length": 150,
+            "max_length": max_length,
             "temperature": 0.9,
             "top_p": 0.9,
             "do_sample": True,
             "return_full_text": False
-        }
+        },
+        # Identical payloads would otherwise get the API's cached completion,
+        # leaving the text cache with a single variant per key
+        "options": {"use_cache": False}
     }
     
     print(f"🔑 Using API key: {HUGGINGFACE_API_KEY[:10]}...")
     print(f"🎯 Using model: {HUGGINGFACE_MODEL}")
     
-    for attempt in range(max_retries):
-        try:
-            print(f"🔄 Attempt {attempt + 1} of {max_retries}")
-            response = requests.post(API_URL, headers=headers, json=payload)
-            print(f"📡 Response Status: {response.status_code}")
-            
-            if response.status_code == 200:
-                return response.json()[0]["generated_text"]
-            elif response.status_code == 401:
-                print("❌ Authentication failed. Please check your API key.")
-                break
-            elif response.status_code == 503:
-                print("⏳ Model is loading, waiting...")
-                time.sleep(2)
-                continue
-            else:
-                print(f"❌ Error: Status code {response.status_code}")
-                print(f"Response: {response.text}")
-                
-        except Exception as e:
-            print(f"❌ Error in attempt {attempt + 1}: {str(e)}")
-            if attempt == max_retries - 1:
-                break
-            time.sleep(2)
+    response = await post_with_retry(
+        API_URL, headers=headers, json=payload,
+        max_retries=max_retries, retry_delay=2, label=HUGGINGFACE_MODEL
+    )
+    if response is not None:
+        print(f"📡 Response Status: {response.status_code}")
+        if response.status_code == 200:
+            return response.json()[0]["generated_text"]
+        elif response.status_code == 401:
+            print("❌ Authentication failed. Please check your API key.")
+        else:
+            print(f"❌ Error: Status code {response.status_code}")
+            print(f"Response: {response.text}")
     
-    return {
+    return None
+
+async def _parallel_components(event_type: str, theme: str, deadline: float, names: Iterable[str] = COMPONENTS) -> Dict[str, Optional[str]]:
+    """One request per component, all sharing ``deadline``; late or failed ones come back None"""
+    prompts = component_prompts(event_type, theme)
+    tasks = {name: asyncio.create_task(generate_creative_text(prompts[name])) for name in names}
+    try:
+        done, pending = await asyncio.wait(tasks.values(), timeout=deadline)
+    finally:
+        # Late components, or all of them if the caller itself is cancelled
+        for task in tasks.values():
+            task.cancel()
+
+    components = {}
+    for name, task in tasks.items():
+        text = task.result() if task in done and task.exception() is None else None
+        if task in pending:
+            print(f"⏱️ {name} missed the {deadline:g}s text deadline")
+        elif task.exception() is not None:
+            print(f"❌ Error generating {name}: {str(task.exception())}")
+        components[name] = text.strip() if isinstance(text, str) and text.strip() else None
+    return components
+
+async def _structured_components(event_type: str, theme: str, deadline: float, names: Iterable[str] = COMPONENTS) -> Dict[str, Optional[str]]:
+    """All three components from one completion; fields it omits come back None"""
+    try:
+        text = await asyncio.wait_for(generate_creative_text(structured_prompt(event_type, theme)), timeout=deadline)
+    except asyncio.TimeoutError:
+        print(f"⏱️ Structured text missed the {deadline:g}s text deadline")
+        text = None
+    # The prompt ends with "Headline:", so the completion starts with its value
+    fields = parse_structured_text(f"Headline: {text}") if text else {}
+    return {name: fields.get(name) for name in names}
+
+def text_response(event_type: str, theme: str, components: Dict[str, Optional[str]]) -> dict:
+    """Format the response, filling in each missing component separately"""
+    fallbacks = fallback_text(event_type, theme)
+    missing = [name for name in COMPONENTS if not components.get(name)]
+    response = {
         "generated_text": {
-            "headline": f"Error generating headline for {prompt}",
-            "tagline": "Service temporarily unavailable",
-            "description": "Please try again later",
-            "error": "Failed to generate text after multiple attempts"
+            **{name: components.get(name) or fallbacks[name] for name in COMPONENTS},
+            "event_type": event_type,
+            "theme": theme
         }
     }
+    if missing:
+        response["generated_text"]["error"] = f"Used fallback text for: {', '.join(missing)}"
+    return response
+
+async def stream_creative_text(prompt: str, max_length: int = 150) -> AsyncIterator[str]:
+    """Yield completion tokens as the inference server sends them.
+
+    Uses the text-generation-inference ``"stream": true`` protocol; a
+    server that answers with a plain JSON completion yields it whole.
+    Nothing is yielded if the request fails.
+    """
+    if not HUGGINGFACE_API_KEY:
+        return
+
+    headers = {
+        "Authorization": f"Bearer {HUGGINGFACE_API_KEY}",
+        "Content-Type": "application/json"
+    }
+    payload = {
+        "inputs": prompt,
+        "parameters": {
+            "max_length": max_length,
+            "temperature": 0.9,
+            "top_p": 0.9,
+            "do_sample": True,
+            "return_full_text": False
+        },
+        "options": {"use_cache": False},
+        "stream": True
+    }
+
+    async with get_client().stream("POST", API_URL, headers=headers, json=payload) as response:
+        if response.status_code != 200:
+            print(f"❌ Streaming error: Status code {response.status_code}")
+            return
+        if not response.headers.get("content-type", "").startswith("text/event-stream"):
+            yield json.loads(await response.aread())[0]["generated_text"]
+            return
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            token = json.loads(data).get("token") or {}
+            if token.get("text") and not token.get("special"):
+                yield token["text"]
+
+async def stream_text(event_type: str, theme: str, deadline: float = TEXT_DEADLINE, use_cache: bool = True) -> AsyncIterator[Tuple[str, Any]]:
+    """Yield ``("token", text)`` while the structured completion streams, then ``("result", response)``.
+
+    The result has the same shape as ``generate_text``. If every
+    component is cached, or the stream produces nothing, the result
+    comes from ``generate_text`` without any tokens; so does it when the
+    stream breaks off with an error, replacing the partial text.
+    """
+    cached = use_cache and all(text_cache.ready(HUGGINGFACE_MODEL, event_type, theme, name) for name in COMPONENTS)
+    text = ""
+    failed = False
+    if HUGGINGFACE_API_KEY and not cached:
+        loop = asyncio.get_running_loop()
+        give_up_at = loop.time() + deadline
+        tokens = stream_creative_text(structured_prompt(event_type, theme))
+        try:
+            while True:
+                token = await asyncio.wait_for(tokens.__anext__(), timeout=max(0, give_up_at - loop.time()))
+                text += token
+                yield "token", token
+        except StopAsyncIteration:
+            pass
+        except asyncio.TimeoutError:
+            print(f"⏱️ Streamed text missed the {deadline:g}s text deadline")
+        except (httpx.HTTPError, ValueError, KeyError, IndexError, TypeError, AttributeError) as e:
+            # Transport failures and malformed or truncated chunks
+            print(f"❌ Error streaming text: {str(e)}")
+            failed = True
+        finally:
+            await tokens.aclose()
 
-def generate_text(event_type: str, theme: str) -> dict:
-    """Generate creative text for events with structured output"""
+    if not text or failed:
+        yield "result", await generate_text(event_type, theme, deadline=deadline, use_cache=use_cache)
+        return
+
+    # The prompt ends with "Headline:", so the completion starts with its value
+    fields = parse_structured_text(f"Headline: {text}")
+    components = {name: fields.get(name) for name in COMPONENTS}
+    if use_cache:
+        for name, value in components.items():
+            if value:
+                text_cache.add(HUGGINGFACE_MODEL, event_type, theme, name, value)
+    yield "result", text_response(event_type, theme, components)
+
+async def _generate_components(event_type: str, theme: str, deadline: float, names: Iterable[str] = COMPONENTS, structured: Optional[bool] = None) -> Dict[str, Optional[str]]:
+    structured = TEXT_STRUCTURED if structured is None else structured
+    generate_components = _structured_components if structured else _parallel_components
+    return await generate_components(event_type, theme, deadline, names)
+
+async def precompute_text(pairs: List[Tuple[str, str]], variants: int = TEXT_CACHE_VARIANTS, deadline: float = TEXT_DEADLINE) -> int:
+    """Fill the text cache with ``variants`` generations per (event_type, theme); returns texts added"""
+    added = 0
+
+    async def fill(event_type: str, theme: str) -> None:
+        nonlocal added
+        for _ in range(variants):
+            generated = await _generate_components(event_type, theme, deadline)
+            for name, text in generated.items():
+                if text:
+                    text_cache.add(HUGGINGFACE_MODEL, event_type, theme, name, text)
+                    added += 1
+
+    await asyncio.gather(*(fill(event_type, theme) for event_type, theme in pairs))
+    return added
+
+async def generate_text(event_type: str, theme: str, structured: Optional[bool] = None, deadline: float = TEXT_DEADLINE, use_cache: bool = True) -> dict:
+    """Generate creative text for events with structured output.
+
+    Components already in the text cache are served from it in rotation.
+    The rest are requested concurrently (or with one structured prompt
+    when ``structured`` / TEXT_STRUCTURED is set); any component that
+    fails or misses ``deadline`` gets fallback copy on its own.
+    """
     try:
         if not HUGGINGFACE_API_KEY:
             return {
                 "generated_text": {
-                    "headline": f"🎯 {theme.title()} {event_type}",
-                    "tagline": f"Experience the magic of {theme}",
-                    "description": f"Join us for an unforgettable {event_type} experience themed around {theme}.",
+                    **fallback_text(event_type, theme),
                     "event_type": event_type,
                     "theme": theme,
                     "error": "HUGGINGFACE_API_KEY not configured"
                 }
             }
 
-        # Create prompts for different components
-        headline_prompt = f"Create a catchy headline for a {event_type} with the theme '{theme}':"
-        tagline_prompt = f"Write a creative tagline for a {theme}-themed {event_type}:"
-        description_prompt = f"Write a short description for a {theme}-themed {event_type}:"
-
-        # Generate different components
-        headline = generate_creative_text(headline_prompt)
-        tagline = generate_creative_text(tagline_prompt)
-        description = generate_creative_text(description_prompt)
+        components = {}
+        if use_cache:
+            for name in COMPONENTS:
+                components[name] = text_cache.pick(HUGGINGFACE_MODEL, event_type, theme, name)
+        needed = [name for name in COMPONENTS if not components.get(name)]
+        if needed:
+            generated = await _generate_components(event_type, theme, deadline, needed, structured)
+            for name, text in generated.items():
+                if text and use_cache:
+                    text_cache.add(HUGGINGFACE_MODEL, event_type, theme, name, text)
+            components.update(generated)
 
-        # Format the response
-        response = {
-            "generated_text": {
-                "headline": headline.strip() if headline else f"🎯 {theme.title()} {event_type}",
-                "tagline": tagline.strip() if tagline else f"Experience the magic of {theme}",
-                "description": description.strip() if description else f"Join us for an unforgettable {event_type} experience themed around {theme}.",
-                "event_type": event_type,
-                "theme": theme
-            }
-        }
+        response = text_response(event_type, theme, components)
 
         # Debug logging
         print(f"🎯 Generated content for {event_type} - {theme}")
@@ -136,9 +310,25 @@ def generate_text(event_type: str, theme: str) -> dict:
         print(error_msg)
         return {
             "generated_text": {
-                "headline": f"🎯 {theme.title()} {event_type}",
-                "tagline": f"Experience the magic of {theme}",
-                "description": f"Join us for an unforgettable {event_type} experience themed around {theme}.",
+                **fallback_text(event_type, theme),
                 "error": error_msg
             }
-        }
\ No newline at end of file
+        }
+
+if __name__ == "__main__":
+    # Offline precompute: python -m ai_agent.text_generator "wedding:floral,birthday:minimalist"
+    import sys
+    from ai_agent.design_generator import parse_prompt_warmup
+    from ai_agent.http_client import close_client
+
+    async def main(pairs: List[Tuple[str, str]], variants: int) -> None:
+        try:
+            added = await precompute_text(pairs, variants)
+        finally:
+            await close_client()
+        saved = text_cache.save(TEXT_CACHE_FILE)
+        print(f"✅ Added {added} texts; {saved} keys saved to {TEXT_CACHE_FILE}")
+
+    if len(sys.argv) < 2:
+        sys.exit("usage: python -m ai_agent.text_generator EVENT:THEME[,EVENT:THEME...] [VARIANTS]")
+    asyncio.run(main(parse_prompt_warmup(sys.argv[1]), int(sys.argv[2]) if len(sys.argv) > 2 else TEXT_CACHE_VARIANTS))
@@ -1,10 +1,12 @@
-import requests
+from ai_agent.http_client import get_client, inference_url
+from ai_agent.cpu_pool import cpu_pool
+from ai_agent.encoding import encode_image
 from PIL import Image, ImageDraw, ImageFont
 from io import BytesIO
 import base64
 import os
 from dotenv import load_dotenv
-from typing import List, Dict
+from typing import List, Dict, Optional
 import json
 
 load_dotenv()
@@ -28,25 +30,18 @@ PRESET_STYLES = [
     TextStyle("Artistic", "Brush Script", "#1E90FF", ["watercolor", "handdrawn"])
 ]
 
-def generate_text_variations(text: str, image_bytes: bytes, num_styles: int = 5) -> List[Dict]:
+async def generate_text_variations(text: str, image_bytes: bytes, num_styles: int = 5) -> List[Dict]:
     """Generate multiple styled versions of text overlay"""
     try:
-        # Load original image
-        image = Image.open(BytesIO(image_bytes))
         variations = []
 
         # Generate text styles using AI
-        styles = generate_ai_text_styles(text, num_styles)
+        styles = await generate_ai_text_styles(text, num_styles)
 
         for style in styles:
             try:
                 # Create styled text image
-                styled_image = apply_text_style(image.copy(), text, style)
-                
-                # Convert to bytes
-                img_byte_arr = BytesIO()
-                styled_image.save(img_byte_arr, format='PNG')
-                img_bytes = img_byte_arr.getvalue()
+                img_bytes = await apply_text_style(image_bytes, text, style)
                 
                 # Convert to base64
                 img_base64 = base64.b64encode(img_bytes).decode('utf-8')
@@ -71,10 +66,10 @@ def generate_text_variations(text: str, image_bytes: bytes, num_styles: int = 5)
         print(f"Error generating text variations: {str(e)}")
         return []
 
-def generate_ai_text_styles(text: str, num_styles: int) -> List[TextStyle]:
+async def generate_ai_text_styles(text: str, num_styles: int) -> List[TextStyle]:
     """Generate text styles using AI"""
     try:
-        API_URL = f"https://api-inference.huggingface.co/models/{TEXT_TO_IMAGE_MODEL}"
+        API_URL = inference_url(TEXT_TO_IMAGE_MODEL)
         headers = {
             "Authorization": f"Bearer {HUGGINGFACE_API_KEY}",
             "Content-Type": "application/json"
@@ -82,7 +77,7 @@ def generate_ai_text_styles(text: str, num_styles: int) -> List[TextStyle]:
         
         prompt = f"Generate {num_styles} unique and creative text styles for: '{text}'. Include font, color, and effects."
         
-        response = requests.post(
+        response = await get_client().post(
             API_URL,
             headers=headers,
             json={"inputs": prompt}
@@ -100,17 +95,33 @@ def generate_ai_text_styles(text: str, num_styles: int) -> List[TextStyle]:
         print(f"Error generating AI styles: {str(e)}")
         return PRESET_STYLES[:num_styles]
 
-def apply_text_style(image: Image, text: str, style: TextStyle) -> Image:
-    """Apply text style to image"""
+async def apply_text_style(image_bytes: bytes, text: str, style: TextStyle) -> bytes:
+    """Apply text style to image; decoding, compositing and encoding run in the CPU pool"""
+    overlay_bytes = await fetch_styled_text(text, style)
+    return await cpu_pool.run(compose_styled_text, image_bytes, overlay_bytes)
+
+def compose_styled_text(image_bytes: bytes, overlay_bytes: Optional[bytes]) -> bytes:
+    """Paste a rendered text overlay onto the image and encode it as PNG"""
+    image = Image.open(BytesIO(image_bytes))
+    if overlay_bytes:
+        try:
+            styled_text = Image.open(BytesIO(overlay_bytes))
+            image.paste(styled_text, (0, 0), styled_text)
+        except Exception as e:
+            print(f"Error applying text style: {str(e)}")
+    return encode_image(image, "png")
+
+async def fetch_styled_text(text: str, style: TextStyle) -> Optional[bytes]:
+    """Render the styled text with the font-styles model; None if it fails"""
     try:
         # Create text overlay with style
-        API_URL = f"https://api-inference.huggingface.co/models/{FONT_STYLES_MODEL}"
+        API_URL = inference_url(FONT_STYLES_MODEL)
         headers = {"Authorization": f"Bearer {HUGGINGFACE_API_KEY}"}
         
         # Generate styled text prompt
         style_prompt = f"Create text overlay: '{text}' with {style.name} style, {style.font} font, {style.color} color, effects: {', '.join(style.effects)}"
         
-        response = requests.post(
+        response = await get_client().post(
             API_URL,
             headers=headers,
             json={
@@ -124,15 +135,12 @@ def apply_text_style(image: Image, text: str, style: TextStyle) -> Image:
         )
         
         if response.status_code == 200:
-            # Merge styled text with original image
-            styled_text = Image.open(BytesIO(response.content))
-            image.paste(styled_text, (0, 0), styled_text)
-            
-        return image
+            return response.content
+        return None
         
     except Exception as e:
         print(f"Error applying text style: {str(e)}")
-        return image
+        return None
 
 def parse_ai_response(response: dict, num_styles: int) -> List[TextStyle]:
     """Parse AI response into TextStyle objects"""
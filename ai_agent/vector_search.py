@@ -1,6 +1,6 @@
 import os
 from dotenv import load_dotenv
-import requests
+from ai_agent.http_client import get_client
 import json
 from pathlib import Path
 
@@ -13,7 +13,7 @@ QDRANT_API_URL = os.getenv("QDRANT_API_URL")
 QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
 QDRANT_COLLECTION = os.getenv("QDRANT_COLLECTION", "designs")
 
-def search_similar_designs(event_type: str, theme: str):
+async def search_similar_designs(event_type: str, theme: str):
     """
     Search for similar designs based on event type and theme
     """
@@ -47,11 +47,10 @@ def search_similar_designs(event_type: str, theme: str):
 
         # Make request
         print(f"Making request to: {search_url}")
-        response = requests.post(
+        response = await get_client().post(
             search_url,
             headers=headers,
-            json=payload,
-            verify=True  # For HTTPS
+            json=payload
         )
 
         # Check response
@@ -96,7 +95,7 @@ def generate_query_vector(text: str, dim: int = 128):
     
     return vector
 
-def test_qdrant_connection():
+async def test_qdrant_connection():
     """
     Test the Qdrant connection and configuration
     """
@@ -119,7 +118,7 @@ def test_qdrant_connection():
         }
         
         print(f"Testing connection to: {test_url}")
-        response = requests.get(test_url, headers=headers, verify=True)
+        response = await get_client().get(test_url, headers=headers)
         
         if response.status_code == 200:
             print("✅ Qdrant connection successful!")
@@ -136,7 +135,7 @@ def test_qdrant_connection():
         print(f"Current QDRANT_API_KEY: {'Set' if QDRANT_API_KEY else 'Not Set'}")
         return False 
 
-def create_collection():
+async def create_collection():
     """Create the designs collection if it doesn't exist"""
     try:
         if not QDRANT_API_URL or not QDRANT_API_KEY:
@@ -152,7 +151,7 @@ def create_collection():
             "api-key": QDRANT_API_KEY
         }
         
-        check_response = requests.get(check_url, headers=headers)
+        check_response = await get_client().get(check_url, headers=headers)
         
         # If collection exists, return True
         if check_response.status_code == 200:
@@ -169,7 +168,7 @@ def create_collection():
                 }
             }
             
-            create_response = requests.put(check_url, headers=headers, json=payload)
+            create_response = await get_client().put(check_url, headers=headers, json=payload)
             
             if create_response.status_code in [200, 201]:
                 print(f"✅ Collection '{QDRANT_COLLECTION}' created successfully")
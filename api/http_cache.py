@@ -0,0 +1,93 @@
+import os
+from typing import Iterator, List, Optional, Tuple
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+
+# Images are addressed by immutable ids/content hashes, so they can be cached for a long time
+IMAGE_CACHE_MAX_AGE = int(os.getenv("IMAGE_CACHE_MAX_AGE", str(365 * 24 * 3600)))
+IMMUTABLE_CACHE_CONTROL = f"public, max-age={IMAGE_CACHE_MAX_AGE}, immutable"
+RANGE_CHUNK_SIZE = 64 * 1024
+
+def make_etag(digest: str, variant: Optional[tuple] = None) -> str:
+    """Strong ETag for a blob, or for one encoded variant of it"""
+    if not variant:
+        return f'"{digest}"'
+    suffix = "-".join("" if part is None else str(part) for part in variant)
+    return f'"{digest}-{suffix}"'
+
+def _etag_list(header: str) -> List[str]:
+    return [tag.strip().removeprefix("W/") for tag in header.split(",") if tag.strip()]
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """Evaluate If-None-Match (weak comparison, as RFC 9110 requires)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = _etag_list(header)
+    return "*" in tags or etag in tags
+
+def not_modified_response(etag: str, headers: Optional[dict] = None) -> Response:
+    response_headers = {k: v for k, v in (headers or {}).items() if k.lower() in ("vary", "cache-control")}
+    response_headers["ETag"] = etag
+    return Response(status_code=304, headers=response_headers)
+
+def parse_range(request: Request, etag: str, size: int) -> Optional[Tuple[int, int]]:
+    """Return the inclusive byte range asked for, or None to send the full body.
+
+    Only single ``bytes=`` ranges are honoured; anything else falls back to
+    a full response. Raises ValueError when the range is unsatisfiable.
+    """
+    header = request.headers.get("range")
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    if_range = request.headers.get("if-range")
+    if if_range and if_range.strip() != etag:
+        return None
+
+    start_text, _, end_text = header[len("bytes="):].strip().partition("-")
+    try:
+        if start_text:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+        else:
+            suffix = int(end_text)
+            start, end = max(size - suffix, 0), size - 1
+    except ValueError:
+        # Malformed ranges are ignored rather than rejected
+        return None
+    if start >= size or start > end or start < 0:
+        raise ValueError("range not satisfiable")
+    return start, min(end, size - 1)
+
+def range_not_satisfiable(size: int) -> Response:
+    return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+
+def _file_chunks(path: str, start: int, end: int) -> Iterator[bytes]:
+    remaining = end - start + 1
+    with open(path, "rb") as f:
+        f.seek(start)
+        while remaining > 0:
+            chunk = f.read(min(RANGE_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+def partial_file_response(path: str, start: int, end: int, size: int, media_type: str, headers: dict) -> StreamingResponse:
+    """206 response streaming one byte range of a file"""
+    response_headers = dict(headers)
+    response_headers.update({
+        "Content-Range": f"bytes {start}-{end}/{size}",
+        "Content-Length": str(end - start + 1),
+        "Accept-Ranges": "bytes",
+    })
+    return StreamingResponse(_file_chunks(path, start, end), status_code=206, media_type=media_type, headers=response_headers)
+
+def partial_bytes_response(data: bytes, start: int, end: int, media_type: str, headers: dict) -> Response:
+    """206 response for one byte range of an in-memory body"""
+    response_headers = dict(headers)
+    response_headers.update({
+        "Content-Range": f"bytes {start}-{end}/{len(data)}",
+        "Accept-Ranges": "bytes",
+    })
+    return Response(content=data[start:end + 1], status_code=206, media_type=media_type, headers=response_headers)
@@ -1,21 +1,34 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Response, Form, Request
-from fastapi.responses import HTMLResponse, FileResponse
-from ai_agent.text_generator import generate_text
-from ai_agent.image_generator import generate_image
-from ai_agent.image_editor import edit_image, compose_images
+from fastapi import APIRouter, HTTPException, UploadFile, File, Response, Form, Request, Query
+from fastapi.responses import HTMLResponse, FileResponse, JSONResponse, StreamingResponse
+from ai_agent.text_generator import generate_text, stream_text
+from ai_agent.image_generator import generate_image, image_router, image_hedger
+from ai_agent.image_editor import edit_image, compose_images, worker_cache_stats
 from ai_agent.vector_search import search_similar_designs  # Import the vector search function
 from ai_agent.workflow import run_ai_workflow  # Import the workflow function
-from ai_agent.design_generator import generate_designs
-from typing import Dict, Optional, List
+from ai_agent.design_generator import generate_designs, enhanced_prompts
+from ai_agent.cpu_pool import cpu_pool
+from ai_agent.design_store import design_store
+from ai_agent.http_client import get_client
+from ai_agent.blob_store import blob_store
+from ai_agent.encoding import negotiate_format, normalize_format, get_encoded_variant, needs_variant, snap_dimension, detect_format, encoded_variants, FILE_EXTENSIONS, FIT_MODES, MEDIA_TYPES
+from ai_agent.generation_cache import generation_cache
+from ai_agent.text_cache import text_cache
+from ai_agent.jobs import job_queue, job_events
+from ai_agent.job_store import job_store
+from api.http_cache import (
+    IMMUTABLE_CACHE_CONTROL, make_etag, is_not_modified, not_modified_response,
+    parse_range, range_not_satisfiable, partial_file_response, partial_bytes_response
+)
+from typing import Optional, List
+import asyncio
+import os
 import uuid
 from datetime import datetime
-import base64
 from PIL import Image
 import io
 from ai_agent.text_styler import generate_text_variations, TextStyle
 import json
 from fastapi.templating import Jinja2Templates
-import requests
 
 router = APIRouter()
 templates = Jinja2Templates(directory="templates")  # Create templates directory if it doesn't exist
@@ -23,13 +36,167 @@ templates = Jinja2Templates(directory="templates")  # Create templates directory
 # Store generated images in memory (in production, use a database)
 generated_images = {}
 
-# Store designs in memory
-designs_db: Dict[str, dict] = {}
+# Design records live in a byte-bounded store that spills to disk (see
+# ai_agent/design_store.py); their image bytes live once each in the
+# content-addressed blob store and records reference them by hash.
+
+# Width of the thumbnails shown in the search results grid
+THUMBNAIL_WIDTH = 256
+# Per-process cache counters summed across CPU pool workers in /cache-stats
+CACHE_COUNTER_FIELDS = ("hits", "misses", "entries", "bytes", "cached")
+
+async def store_image(image_bytes: Optional[bytes]) -> dict:
+    """Write image bytes to the blob store and return the record fields referencing them"""
+    if not isinstance(image_bytes, (bytes, bytearray)) or not image_bytes:
+        return {"image_hash": None, "image_format": None}
+    return {
+        # Hashing and writing the blob stay off the event loop
+        "image_hash": await asyncio.to_thread(blob_store.put, bytes(image_bytes)),
+        "image_format": detect_format(image_bytes) or "png"
+    }
+
+def has_image(design_data: dict) -> bool:
+    return blob_store.exists(design_data.get("image_hash"))
+
+def download_format(design_data: dict, requested: Optional[str] = None) -> str:
+    """Downloads keep the stored format unless ``format`` asks for another one"""
+    return normalize_format(requested) or design_data.get("image_format") or "png"
+
+async def image_response(request: Request, design_data: dict, fmt: str, quality: Optional[int] = None, width: Optional[int] = None, height: Optional[int] = None, fit: str = "contain", headers: Optional[dict] = None, allow_range: bool = False) -> Response:
+    """Serve a design's image with ETag/Cache-Control validators.
+
+    Bodies come straight from the blob file when no re-encoding is needed.
+    Requested sizes are snapped to the variant size buckets first.
+    ``If-None-Match`` hits return 304; with ``allow_range`` a single
+    ``Range`` request is answered with 206. A blob the store has trimmed
+    answers 404.
+    """
+    digest = design_data["image_hash"]
+    width, height = snap_dimension(width), snap_dimension(height)
+    passthrough = not needs_variant(design_data.get("image_format"), fmt, quality, width, height)
+    variant = None if passthrough else (fmt, quality, width, height, fit if width or height else None)
+    etag = make_etag(digest, variant)
+    headers = dict(headers or {})
+    headers.update({"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL})
+    if allow_range:
+        headers["Accept-Ranges"] = "bytes"
+
+    if is_not_modified(request, etag):
+        return not_modified_response(etag, headers)
+
+    if passthrough:
+        path = blob_store.path(digest)
+        try:
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            # The blob store trimmed it after the record was written
+            raise HTTPException(status_code=404, detail="Image not found")
+        blob_store.touch(digest)
+        if allow_range:
+            try:
+                byte_range = parse_range(request, etag, size)
+            except ValueError:
+                return range_not_satisfiable(size)
+            if byte_range:
+                return partial_file_response(path, *byte_range, size, MEDIA_TYPES[fmt], headers)
+        return FileResponse(path, media_type=MEDIA_TYPES[fmt], headers=headers)
+
+    image_data, media_type = await get_encoded_variant(
+        digest, fmt, quality, width=width, height=height, fit=fit
+    )
+    if image_data is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    if allow_range:
+        try:
+            byte_range = parse_range(request, etag, len(image_data))
+        except ValueError:
+            return range_not_satisfiable(len(image_data))
+        if byte_range:
+            return partial_bytes_response(image_data, *byte_range, media_type, headers)
+    return Response(content=image_data, media_type=media_type, headers=headers)
+
+async def create_image_design(prompt: str, size: str, use_cache: bool = True) -> Optional[str]:
+    """Generate an image and store it as a design; returns its id, or None if generation failed"""
+    width, height = map(int, size.split('x'))
+    image_bytes = await generate_image(prompt, (width, height), use_cache=use_cache)
+    if image_bytes is None:
+        return None
+
+    # Generate unique ID
+    image_id = str(uuid.uuid4())
+    
+    # Store image with metadata
+    design_store.put(image_id, {
+        **await store_image(image_bytes),
+        "prompt": prompt,
+        "size": size,
+        "created_at": datetime.now().isoformat(),
+        "metadata": {
+            "event_type": prompt.split("event_type=")[-1].split("&")[0],
+            "theme": prompt.split("theme=")[-1]
+        }
+    })
+    return image_id
+
+async def store_design(design: dict) -> str:
+    """Store a generated or similar design from a search and return its new id"""
+    design_id = str(uuid.uuid4())
+    design_store.put(design_id, {
+        **await store_image(design.get("image_bytes")),
+        "url": design.get("url"),
+        "metadata": {
+            "event_type": design.get("event_type", "N/A"),
+            "theme": design.get("theme", "N/A")
+        },
+        "similarity_score": design.get("similarity_score", 0),
+        "created_at": datetime.now().isoformat()
+    })
+    return design_id
+
+def job_design(design_id: str) -> dict:
+    """JSON summary of a stored design, saved in a background job's result"""
+    design_data = design_store.get(design_id) or {}
+    return {
+        "id": design_id,
+        "image_hash": design_data.get("image_hash"),
+        "image_format": design_data.get("image_format"),
+        "url": design_data.get("url"),
+        "similarity_score": design_data.get("similarity_score")
+    }
+
+def present_job(job: dict) -> dict:
+    """Public view of a job; images are linked through /jobs/ so any app process can serve them"""
+    result = job["result"]
+    if result:
+        for index, design in enumerate(result.get("designs", [])):
+            design["image_url"] = f"/jobs/{job['id']}/images/{index}" if design.get("image_hash") else design.get("url")
+    return {
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "progress": job["progress"],
+        "result": result,
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"]
+    }
+
+async def submit_job(kind: str, params: dict) -> JSONResponse:
+    try:
+        job_id = await job_queue.submit(kind, params)
+    except asyncio.QueueFull:
+        raise HTTPException(status_code=503, detail="Too many queued jobs, try again shortly", headers={"Retry-After": "5"})
+    return JSONResponse(status_code=202, content={
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/jobs/{job_id}",
+        "events_url": f"/jobs/{job_id}/events"
+    })
 
 @router.post("/generate-text/")
-async def generate_text_route(event_type: str, theme: str):
+async def generate_text_route(event_type: str, theme: str, structured: Optional[bool] = None, use_cache: bool = True):
     try:
-        result = generate_text(event_type, theme)
+        result = await generate_text(event_type, theme, structured=structured, use_cache=use_cache)
         if isinstance(result, dict) and "error" in result.get("generated_text", {}):
             return {
                 "status": "partial_success",
@@ -55,36 +222,31 @@ async def generate_text_route(event_type: str, theme: str):
             }
         }
 
+@router.api_route("/generate-text/stream/", methods=["GET", "POST"])
+async def generate_text_stream_route(event_type: str, theme: str, use_cache: bool = True):
+    """Server-sent events: a ``token`` event per generated token, then one ``result``
+    event with the same structured object as /generate-text/ returns in ``data``"""
+    async def events():
+        async for kind, data in stream_text(event_type, theme, use_cache=use_cache):
+            payload = {"text": data} if kind == "token" else data
+            yield f"event: {kind}\ndata: {json.dumps(payload)}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @router.post("/generate-image/")
-async def generate_image_route(prompt: str, size: str = "512x512"):
+async def generate_image_route(prompt: str, size: str = "512x512", use_cache: bool = True, background: bool = False):
     try:
-        width, height = map(int, size.split('x'))
-        image_bytes = generate_image(prompt, (width, height))
-        
-        if image_bytes is None:
+        if background:
+            return await submit_job("generate-image", {"prompt": prompt, "size": size, "use_cache": use_cache})
+
+        image_id = await create_image_design(prompt, size, use_cache)
+        if image_id is None:
             raise HTTPException(
                 status_code=500,
                 detail="Failed to generate image after multiple attempts. Please try again later."
             )
+        design_record = design_store.get(image_id)
 
-        # Generate unique ID
-        image_id = str(uuid.uuid4())
-        
-        # Store image with metadata
-        designs_db[image_id] = {
-            "image": image_bytes,
-            "prompt": prompt,
-            "size": size,
-            "created_at": datetime.now().isoformat(),
-            "metadata": {
-                "event_type": prompt.split("event_type=")[-1].split("&")[0],
-                "theme": prompt.split("theme=")[-1]
-            }
-        }
-        
-        # Convert to base64 for display
-        image_base64 = base64.b64encode(image_bytes).decode()
-        
         html_content = f"""
         <html>
             <head>
@@ -168,9 +330,9 @@ async def generate_image_route(prompt: str, size: str = "512x512"):
                         
                         <div class="design-info">
                             <h3>Design Details</h3>
-                            <p><strong>Event Type:</strong> {designs_db[image_id]['metadata']['event_type']}</p>
-                            <p><strong>Theme:</strong> {designs_db[image_id]['metadata']['theme']}</p>
-                            <p><strong>Created:</strong> {designs_db[image_id]['created_at']}</p>
+                            <p><strong>Event Type:</strong> {design_record['metadata']['event_type']}</p>
+                            <p><strong>Theme:</strong> {design_record['metadata']['theme']}</p>
+                            <p><strong>Created:</strong> {design_record['created_at']}</p>
                             <p><strong>Size:</strong> {size}</p>
                             <div>
                                 <span class="design-id">ID: {image_id}</span>
@@ -179,7 +341,7 @@ async def generate_image_route(prompt: str, size: str = "512x512"):
                         </div>
 
                         <div class="image-container">
-                            <img src="data:image/png;base64,{image_base64}" alt="Generated Design">
+                            <img src="/image/{image_id}" alt="Generated Design">
                         </div>
 
                         <div class="actions">
@@ -195,29 +357,28 @@ async def generate_image_route(prompt: str, size: str = "512x512"):
         
         return HTMLResponse(content=html_content)
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/download-design/{design_id}")
-async def download_design_route(design_id: str):
+async def download_design_route(request: Request, design_id: str, format: Optional[str] = None, quality: Optional[int] = Query(None, ge=0, le=100)):
     """Download generated design by ID"""
     try:
-        if design_id not in designs_db:
+        design_data = design_store.get(design_id)
+        if design_data is None or not has_image(design_data):
             raise HTTPException(status_code=404, detail="Design not found")
         
-        design_data = designs_db[design_id]
-        image_bytes = design_data["image"]
-        filename = f"design_{design_id}.png"
+        fmt = download_format(design_data, format)
+        filename = f"design_{design_id}.{FILE_EXTENSIONS[fmt]}"
         
-        return Response(
-            content=image_bytes,
-            media_type="image/png",
-            headers={
-                "Content-Disposition": f"attachment; filename={filename}",
-                "Content-Type": "image/png"
-            }
-        )
+        return await image_response(request, design_data, fmt, quality, headers={
+            "Content-Disposition": f"attachment; filename={filename}"
+        }, allow_range=True)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Download error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -226,18 +387,17 @@ async def download_design_route(design_id: str):
 async def edit_design_form(request: Request, design_id: str):
     """Show edit form for a design"""
     try:
-        if design_id not in designs_db:
+        if design_id not in design_store:
             raise HTTPException(status_code=404, detail="Design not found")
             
-        design_data = designs_db[design_id]
-        image_base64 = base64.b64encode(design_data["image"]).decode()
-        
         return templates.TemplateResponse("edit_form.html", {
             "request": request,
             "design_id": design_id,
-            "image_base64": image_base64
+            "image_url": f"/image/{design_id}"
         })
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error loading edit form: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -257,11 +417,12 @@ async def edit_design_route(
 ):
     """Apply edits to design"""
     try:
-        if design_id not in designs_db:
+        design_data = design_store.get(design_id)
+        if design_data is None:
             raise HTTPException(status_code=404, detail="Design not found")
         
-        # Get original image
-        original_image = designs_db[design_id]["image"]
+        if not has_image(design_data):
+            raise HTTPException(status_code=404, detail="Design image not found")
         
         # Prepare text style
         text_style = {
@@ -276,20 +437,26 @@ async def edit_design_route(
         if overlay_image:
             overlay_bytes = await overlay_image.read()
         
-        # Apply edits
-        edited_image = edit_image(
-            original_image,
+        # Apply edits in a worker process; keying by design id keeps the
+        # worker's decoded-image cache warm for repeated edits, and the
+        # worker only reads the original from the blob store on a miss
+        edited_image = await cpu_pool.run(
+            edit_image,
+            None,
             effect=effect,
             text_overlay=text_overlay,
             text_style=text_style,
             overlay_image=overlay_bytes,
-            overlay_position=overlay_position
+            overlay_position=overlay_position,
+            design_id=design_id,
+            image_hash=design_data["image_hash"],
+            key=design_id
         )
         
         # Store edited version
         edited_id = f"{design_id}_edited_{str(uuid.uuid4())[:8]}"
-        designs_db[edited_id] = {
-            "image": edited_image,
+        design_store.put(edited_id, {
+            **await store_image(edited_image),
             "parent_id": design_id,
             "created_at": datetime.now().isoformat(),
             "edits": {
@@ -298,50 +465,174 @@ async def edit_design_route(
                 "text_style": text_style,
                 "has_overlay": overlay_image is not None
             }
-        }
-        
-        # Convert for display
-        image_base64 = base64.b64encode(edited_image).decode()
+        })
         
         return templates.TemplateResponse("edit_result.html", {
             "request": request,
-            "image_base64": image_base64,
+            "image_url": f"/image/{edited_id}",
             "design_id": edited_id,
             "original_id": design_id
         })
         
+    except HTTPException:
+        raise
+    except FileNotFoundError:
+        # The blob store trimmed the original since the record was checked
+        raise HTTPException(status_code=404, detail="Design image not found")
     except Exception as e:
         print(f"Edit error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/image/{image_id}")
-async def get_image_route(image_id: str):
+async def get_image_route(
+    request: Request,
+    image_id: str,
+    format: Optional[str] = None,
+    quality: Optional[int] = Query(None, ge=0, le=100),
+    width: Optional[int] = Query(None, gt=0),
+    height: Optional[int] = Query(None, gt=0),
+    fit: str = "contain"
+):
     try:
-        if image_id not in designs_db:
+        design_data = design_store.get(image_id)
+        if design_data is None or not has_image(design_data):
             raise HTTPException(status_code=404, detail="Image not found")
+        if fit not in FIT_MODES:
+            raise HTTPException(status_code=400, detail=f"fit must be one of {', '.join(FIT_MODES)}")
             
-        image_data = designs_db[image_id]["image"]
-        return Response(content=image_data, media_type="image/png")
+        fmt = negotiate_format(request.headers.get("accept"), format)
+        return await image_response(request, design_data, fmt, quality, width, height, fit, headers={"Vary": "Accept"})
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def combine_stats(stats: List[dict]) -> dict:
+    """Add up per-process cache counters; limits and other fields are taken from the first"""
+    combined = dict(stats[0])
+    for other in stats[1:]:
+        for field in CACHE_COUNTER_FIELDS:
+            if field in combined:
+                combined[field] += other.get(field, 0)
+    combined["processes"] = len(stats)
+    return combined
+
+@router.get("/cache-stats")
+async def cache_stats_route():
+    """Report size and hit/miss counters of the in-process stores and caches.
+
+    Decoded images and fonts are cached inside the CPU pool workers, so
+    their counters are gathered from every running worker plus this
+    process (which renders when the pool falls back to a thread).
+    """
+    caches = [worker_cache_stats()] + await cpu_pool.run_on_each(worker_cache_stats)
+    return {
+        "design_store": design_store.stats(),
+        "blob_store": blob_store.stats(),
+        "decoded_images": combine_stats([cache["decoded_images"] for cache in caches]),
+        "encoded_variants": encoded_variants.stats(),
+        "fonts": combine_stats([cache["fonts"] for cache in caches]),
+        "cpu_pool": cpu_pool.stats(),
+        "generation_cache": generation_cache.stats(),
+        "enhanced_prompts": enhanced_prompts.stats(),
+        "text_cache": text_cache.stats(),
+        "image_models": image_router.stats(),
+        "image_hedging": image_hedger.stats(),
+        "jobs": await asyncio.to_thread(job_queue.stats)
+    }
+
+async def generate_image_job(params: dict, progress) -> dict:
+    image_id = await create_image_design(params["prompt"], params["size"], params.get("use_cache", True))
+    if image_id is None:
+        raise RuntimeError("Failed to generate image after multiple attempts")
+    return {"designs": [job_design(image_id)]}
+
+async def search_designs_job(params: dict, progress) -> dict:
+    event_type, theme = params["event_type"], params["theme"]
+    num_designs = 5
+    designs = []
+
+    async def on_design(design: dict) -> None:
+        designs.append(job_design(await store_design(design)))
+        progress(len(designs) / (num_designs + 1), {"designs": designs})
+
+    await generate_designs(event_type, theme, num_designs=num_designs, use_cache=params.get("use_cache", True), on_design=on_design)
+    for design in await search_similar_designs(event_type, theme):
+        designs.append(job_design(await store_design(design)))
+    return {"designs": designs}
+
+job_queue.register("generate-image", generate_image_job)
+job_queue.register("search-designs", search_designs_job)
+
+@router.get("/jobs/{job_id}")
+async def job_status_route(job_id: str):
+    """Poll a background job for status, progress and results"""
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return present_job(job)
+
+@router.get("/jobs/{job_id}/events")
+async def job_events_route(job_id: str):
+    """Server-sent events: ``progress`` on each update, then ``succeeded`` or ``failed``"""
+    if await asyncio.to_thread(job_store.get, job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return StreamingResponse(job_events(job_id, present_job), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.get("/jobs/{job_id}/images/{index}")
+async def job_image_route(
+    request: Request,
+    job_id: str,
+    index: int,
+    format: Optional[str] = None,
+    quality: Optional[int] = Query(None, ge=0, le=100),
+    width: Optional[int] = Query(None, gt=0),
+    height: Optional[int] = Query(None, gt=0),
+    fit: str = "contain"
+):
+    """Image of one design in a job's result, readable from any app process"""
+    job = await asyncio.to_thread(job_store.get, job_id)
+    designs = ((job or {}).get("result") or {}).get("designs", [])
+    if not 0 <= index < len(designs) or not has_image(designs[index]):
+        raise HTTPException(status_code=404, detail="Image not found")
+    if fit not in FIT_MODES:
+        raise HTTPException(status_code=400, detail=f"fit must be one of {', '.join(FIT_MODES)}")
+
+    fmt = negotiate_format(request.headers.get("accept"), format)
+    return await image_response(request, designs[index], fmt, quality, width, height, fit, headers={"Vary": "Accept"})
+
 @router.post("/search-designs/")
-async def search_designs_route(event_type: str, theme: str):
+async def search_designs_route(event_type: str, theme: str, use_cache: bool = True, background: bool = False):
     """
     Generate and showcase designs with their details and IDs
     """
     try:
-        # Generate designs using Stable Diffusion
-        generated_designs = generate_designs(event_type, theme, num_designs=5)
-        
-        # Add vector search results if available
-        similar_designs = search_similar_designs(event_type, theme)
-        
-        # Combine both results
-        all_designs = generated_designs + similar_designs
-        
-        html_content = f"""
+        if background:
+            return await submit_job("search-designs", {"event_type": event_type, "theme": theme, "use_cache": use_cache})
+
+        # Stream the page: the shell goes out at once, then each card as soon as it is ready
+        return StreamingResponse(
+            search_results_stream(event_type, theme, use_cache),
+            media_type="text/html",
+            headers={"X-Accel-Buffering": "no"}
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+NO_DESIGNS_HTML = """
+            <div style="text-align: center; padding: 30px;">
+                <h3>No Designs Found</h3>
+                <p>Try different search terms</p>
+            </div>
+        """
+
+def search_page_head(event_type: str, theme: str) -> str:
+    """Search results page up to the opening of the designs grid"""
+    return f"""
         <html>
             <head>
                 <title>Generated Designs</title>
@@ -474,51 +765,32 @@ async def search_designs_route(event_type: str, theme: str):
                         <h1>AI-Generated Designs</h1>
                         <p><strong>Event Type:</strong> {event_type}</p>
                         <p><strong>Theme:</strong> {theme}</p>
-                        <p><strong>Generated:</strong> {len(generated_designs)} new designs</p>
+                        <p><strong>Generated:</strong> <span id="generated-count">…</span> new designs</p>
                     </div>
                     <div class="designs-grid">
-                        {generate_design_cards(all_designs)}
+"""
+
+def search_page_tail(generated: int) -> str:
+    return f"""
                     </div>
                 </div>
+                <script>document.getElementById('generated-count').textContent = '{generated}';</script>
             </body>
         </html>
         """
-        return HTMLResponse(content=html_content)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
 
-def generate_design_cards(designs):
-    """Helper function to generate HTML for design cards"""
-    if not designs:
-        return """
-            <div style="text-align: center; padding: 30px;">
-                <h3>No Designs Found</h3>
-                <p>Try different search terms</p>
-            </div>
-        """
+async def design_card(design: dict) -> str:
+    """Store a design from a search and return the HTML card for it"""
+    design_id = await store_design(design)
     
-    cards = ""
-    for design in designs:
-        # Use existing ID or generate new one
-        design_id = str(uuid.uuid4())
-        
-        # Store complete design data
-        designs_db[design_id] = {
-            "image": design.get("image_bytes"),
-            "url": design.get("url"),
-            "metadata": {
-                "event_type": design.get("event_type", "N/A"),
-                "theme": design.get("theme", "N/A")
-            },
-            "similarity_score": design.get("similarity_score", 0),
-            "created_at": datetime.now().isoformat()
-        }
-        
-        # Create card HTML
-        cards += f"""
+    # Thumbnails for designs we hold bytes for; remote results keep their URL
+    image_src = f"/image/{design_id}?width={THUMBNAIL_WIDTH}" if design.get("image_bytes") else design.get('url', '#')
+    
+    # Create card HTML
+    return f"""
             <div class="design-card">
                 <div class="design-image-container">
-                    <img src="{design['url']}" alt="Design" class="design-image">
+                    <img src="{image_src}" alt="Design" class="design-image" loading="lazy">
                     <span class="score-badge">{design.get('similarity_score', 0):.1f}% Match</span>
                     <span class="design-type">{'AI Generated' if design.get('similarity_score') == 100 else 'Similar'}</span>
                 </div>
@@ -534,24 +806,72 @@ def generate_design_cards(designs):
                 </div>
             </div>
         """
-    return cards
+
+async def search_results_stream(event_type: str, theme: str, use_cache: bool = True):
+    """Yield the search page shell, then a card per design in the order they become ready.
+
+    Qdrant matches and generated designs are produced concurrently; a
+    client disconnect cancels whatever is still running.
+    """
+    yield search_page_head(event_type, theme)
+
+    ready: asyncio.Queue = asyncio.Queue()
+
+    async def similar_source():
+        for design in await search_similar_designs(event_type, theme):
+            ready.put_nowait(("similar", design))
+
+    async def generated_source():
+        await generate_designs(
+            event_type, theme, num_designs=5, use_cache=use_cache,
+            on_design=lambda design: ready.put_nowait(("generated", design))
+        )
+
+    sources = [asyncio.create_task(similar_source()), asyncio.create_task(generated_source())]
+    for task in sources:
+        task.add_done_callback(lambda _: ready.put_nowait(None))
+
+    finished = shown = generated = 0
+    try:
+        while finished < len(sources):
+            item = await ready.get()
+            if item is None:
+                finished += 1
+                continue
+            source, design = item
+            try:
+                card = await design_card(design)
+            except Exception as e:
+                print(f"Error rendering design card: {str(e)}")
+                continue
+            shown += 1
+            generated += source == "generated"
+            yield card
+    finally:
+        for task in sources:
+            task.cancel()
+
+    for task in sources:
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Error in design search: {str(task.exception())}")
+    if not shown:
+        yield NO_DESIGNS_HTML
+    yield search_page_tail(generated)
 
 @router.get("/view-design/{design_id}")
 async def view_design_route(request: Request, design_id: str):
     """View design details and preview"""
     try:
-        if design_id not in designs_db:
+        design_data = design_store.get(design_id)
+        if design_data is None:
             raise HTTPException(status_code=404, detail="Design not found")
         
-        design_data = designs_db[design_id]
-        
-        # Handle both URL-based and bytes-based images
-        if "url" in design_data:
-            image_url = design_data["url"]
-            image_display = image_url
+        # Serve stored bytes through /image/ so the browser can cache them;
+        # remote search results keep their original URL
+        if has_image(design_data):
+            image_display = f"/image/{design_id}"
         else:
-            image_base64 = base64.b64encode(design_data["image"]).decode()
-            image_display = f"data:image/png;base64,{image_base64}"
+            image_display = design_data.get("url") or "#"
         
         # Get metadata with defaults
         metadata = design_data.get("metadata", {})
@@ -572,52 +892,43 @@ async def view_design_route(request: Request, design_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/download-search-design/{design_id}")
-async def download_search_design(design_id: str):
+async def download_search_design(request: Request, design_id: str, format: Optional[str] = None, quality: Optional[int] = Query(None, ge=0, le=100)):
     """Download design from search results"""
     try:
-        if design_id not in designs_db:
+        design_data = design_store.get(design_id)
+        if design_data is None:
             raise HTTPException(status_code=404, detail="Design not found")
-            
-        design_data = designs_db[design_id]
         
-        # If design has URL, download it first
-        if "url" in design_data and design_data["url"]:
+        # Fetch remote results once and keep them in the blob store
+        if not has_image(design_data) and design_data.get("url"):
             try:
                 headers = {
                     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
                 }
-                response = requests.get(
+                response = await get_client().get(
                     design_data["url"], 
                     timeout=10,
-                    headers=headers,
-                    allow_redirects=True
+                    headers=headers
                 )
                 response.raise_for_status()
-                image_bytes = response.content
+                design_data.update(await store_image(response.content))
+                design_store.put(design_id, design_data)
             except Exception as e:
                 print(f"Failed to download from URL ({design_data['url']}): {str(e)}")
-                # Fallback to stored image bytes if available
-                if "image" in design_data and design_data["image"]:
-                    image_bytes = design_data["image"]
-                else:
-                    raise HTTPException(status_code=500, detail="Failed to download image and no backup available")
-        # If design has image bytes stored directly
-        elif "image" in design_data and design_data["image"]:
-            image_bytes = design_data["image"]
-        else:
-            raise HTTPException(status_code=500, detail="No image data found")
+                raise HTTPException(status_code=500, detail="Failed to download image and no backup available")
+        
+        if not has_image(design_data):
+            raise HTTPException(status_code=404, detail="Design image not found")
             
-        filename = f"design_{design_id}.png"
+        fmt = download_format(design_data, format)
+        filename = f"design_{design_id}.{FILE_EXTENSIONS[fmt]}"
         
-        return Response(
-            content=image_bytes,
-            media_type="image/png",
-            headers={
-                "Content-Disposition": f"attachment; filename={filename}",
-                "Content-Type": "image/png"
-            }
-        )
+        return await image_response(request, design_data, fmt, quality, headers={
+            "Content-Disposition": f"attachment; filename={filename}"
+        }, allow_range=True)
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Download error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,7 +1,12 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from api.routes import router
 from ai_agent.vector_search import test_qdrant_connection, create_collection
+from ai_agent.http_client import close_client
+from ai_agent.cpu_pool import cpu_pool
+from ai_agent.jobs import job_queue
+from ai_agent.design_generator import warm_prompt_cache, warm_placeholder_designs
 
 app = FastAPI(title="ALI HAIDER AI Agent", description="The job of this AI agent is to generate a photo for us according to our details.", version="1.0.0")
 
@@ -18,16 +23,29 @@ app.add_middleware(
 async def startup_event():
     try:
         # Test Qdrant connection
-        connection_success = test_qdrant_connection()
+        connection_success = await test_qdrant_connection()
         if connection_success:
             # Create collection if it doesn't exist
-            create_collection()
+            await create_collection()
         else:
             print("⚠️ Warning: Qdrant connection test failed")
     except Exception as e:
         print(f"⚠️ Error during startup: {str(e)}")
         # Continue running even if Qdrant setup fails
 
+    # Placeholder designs are served from memory during upstream outages
+    warm_placeholder_designs()
+
+    # Enhance PROMPT_WARMUP pairs in the background so startup is not delayed
+    app.state.prompt_warmup = asyncio.create_task(warm_prompt_cache())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Stop background jobs, then release pooled outbound connections and image worker processes
+    await job_queue.shutdown()
+    await close_client()
+    cpu_pool.shutdown()
+
 # Include router after startup configuration
 try:
     app.include_router(router)
@@ -0,0 +1,140 @@
+"""Local stand-in for the Hugging Face inference API.
+
+Serves ``POST /models/{model}`` the way api-inference.huggingface.co does,
+so the app can be load tested without paying for (or waiting on) real
+inference. Point the app at it with
+``HUGGINGFACE_INFERENCE_URL=http://127.0.0.1:9000/models``.
+
+Requests whose parameters look like image generation (steps, guidance,
+width/height or size) get a PNG; everything else gets a text-generation
+JSON list. Behaviour is tuned through environment variables:
+
+- ``MOCK_LATENCY`` / ``MOCK_LATENCY_JITTER``: seconds per response
+- ``MOCK_LOADING_RATE``: fraction of requests answered with 503 "model loading"
+- ``MOCK_COLD_START``: seconds after startup during which every model is loading
+- ``MOCK_IMAGE_BYTES``: pad image responses to at least this many bytes
+- ``MOCK_ERROR_RATE``: fraction of requests answered with 500
+- ``MOCK_FIRST_TOKEN`` / ``MOCK_TOKEN_DELAY``: pacing of ``"stream": true`` text responses
+
+Run with ``python -m loadtest.mock_inference --port 9000``.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import time
+from functools import lru_cache
+from io import BytesIO
+from typing import Tuple
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from PIL import Image
+from PIL.PngImagePlugin import PngInfo
+
+MOCK_LATENCY = float(os.getenv("MOCK_LATENCY", "1.0"))
+MOCK_LATENCY_JITTER = float(os.getenv("MOCK_LATENCY_JITTER", "0.5"))
+MOCK_LOADING_RATE = float(os.getenv("MOCK_LOADING_RATE", "0.05"))
+MOCK_COLD_START = float(os.getenv("MOCK_COLD_START", "0"))
+MOCK_IMAGE_BYTES = int(os.getenv("MOCK_IMAGE_BYTES", str(512 * 1024)))
+MOCK_ERROR_RATE = float(os.getenv("MOCK_ERROR_RATE", "0"))
+MOCK_FIRST_TOKEN = float(os.getenv("MOCK_FIRST_TOKEN", "0.2"))
+MOCK_TOKEN_DELAY = float(os.getenv("MOCK_TOKEN_DELAY", "0.05"))
+
+IMAGE_PARAMETERS = ("num_inference_steps", "guidance_scale", "width", "height", "size")
+
+app = FastAPI(title="Mock inference API")
+started_at = time.monotonic()
+counters = {"requests": 0, "images": 0, "texts": 0, "loading": 0, "errors": 0}
+
+@lru_cache(maxsize=32)
+def render_image(size: Tuple[int, int], min_bytes: int) -> bytes:
+    """PNG of ``size`` padded with a text chunk to ``min_bytes``; rendered once per shape"""
+    image = Image.new("RGB", size, (90, 120, 200))
+    buffer = BytesIO()
+    image.save(buffer, format="PNG")
+    padding = min_bytes - buffer.tell()
+    if padding > 0:
+        info = PngInfo()
+        info.add_text("padding", "x" * padding)
+        buffer = BytesIO()
+        image.save(buffer, format="PNG", pnginfo=info)
+    return buffer.getvalue()
+
+def requested_size(parameters: dict) -> Tuple[int, int]:
+    size = parameters.get("size")
+    if isinstance(size, (list, tuple)) and len(size) == 2:
+        return int(size[0]), int(size[1])
+    if isinstance(size, str) and "x" in size:
+        width, height = size.split("x", 1)
+        return int(width), int(height)
+    return int(parameters.get("width", 512)), int(parameters.get("height", 512))
+
+def completion(prompt: str) -> str:
+    """Canned completion; prompts ending in "Headline:" get the structured copy format"""
+    if prompt.rstrip().endswith("Headline:"):
+        return " A Celebration in Bloom\nTagline: Where every moment blossoms\nDescription: An evening of music, flowers and good company.\n"
+    return " A celebration to remember, full of color and joy."
+
+async def token_events(text: str):
+    """Text-generation-inference style server-sent events, one per token"""
+    await asyncio.sleep(MOCK_FIRST_TOKEN)
+    tokens = re.findall(r"\s*\S+|\s+", text)
+    for index, token in enumerate(tokens):
+        last = index == len(tokens) - 1
+        event = {
+            "token": {"id": index, "text": token, "logprob": 0.0, "special": False},
+            "generated_text": text if last else None,
+            "details": None,
+        }
+        yield f"data: {json.dumps(event)}\n\n"
+        await asyncio.sleep(MOCK_TOKEN_DELAY)
+
+@app.post("/models/{model:path}")
+async def infer(model: str, request: Request):
+    counters["requests"] += 1
+    try:
+        payload = await request.json()
+    except ValueError:
+        payload = {}
+    parameters = payload.get("parameters") or {}
+
+    if time.monotonic() - started_at < MOCK_COLD_START or random.random() < MOCK_LOADING_RATE:
+        counters["loading"] += 1
+        estimated = max(1.0, MOCK_COLD_START - (time.monotonic() - started_at))
+        return JSONResponse(
+            {"error": f"Model {model} is currently loading", "estimated_time": estimated},
+            status_code=503,
+        )
+
+    is_image = any(name in parameters for name in IMAGE_PARAMETERS)
+    prompt = payload.get("inputs", "")
+    if payload.get("stream") and not is_image:
+        counters["texts"] += 1
+        return StreamingResponse(token_events(completion(prompt)), media_type="text/event-stream")
+
+    await asyncio.sleep(max(0.0, random.uniform(MOCK_LATENCY - MOCK_LATENCY_JITTER, MOCK_LATENCY + MOCK_LATENCY_JITTER)))
+
+    if random.random() < MOCK_ERROR_RATE:
+        counters["errors"] += 1
+        return JSONResponse({"error": "Internal error"}, status_code=500)
+
+    if is_image:
+        counters["images"] += 1
+        return Response(render_image(requested_size(parameters), MOCK_IMAGE_BYTES), media_type="image/png")
+
+    counters["texts"] += 1
+    return [{"generated_text": completion(prompt)}]
+
+@app.get("/stats")
+async def stats():
+    return counters
+
+if __name__ == "__main__":
+    import uvicorn
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,195 @@
+"""End-to-end load test for the main endpoints.
+
+Drives ``/generate-image/``, ``/search-designs/`` and ``/edit-design/``
+with a fixed number of requests at a fixed concurrency and reports
+throughput and latency percentiles per endpoint.
+
+With ``--spawn`` it starts ``loadtest.mock_inference`` and the app itself
+(wired to the mock through ``HUGGINGFACE_INFERENCE_URL``), so the numbers
+measure the app's own overhead rather than Hugging Face. Mock behaviour
+is configured with the ``MOCK_*`` environment variables, which are passed
+through to the spawned server.
+
+    python -m loadtest.run --spawn --requests 100 --concurrency 20
+    python -m loadtest.run --base-url http://127.0.0.1:8000 --scenarios edit-design
+"""
+import argparse
+import asyncio
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+import httpx
+
+SCENARIOS = ("generate-image", "search-designs", "edit-design")
+IMAGE_ID_PATTERN = re.compile(r"/image/([\w-]+)")
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of ``values`` (which must be sorted)"""
+    if not values:
+        return 0.0
+    rank = max(0, min(len(values) - 1, round(pct / 100 * len(values) + 0.5) - 1))
+    return values[rank]
+
+class Result:
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies: List[float] = []
+        self.statuses: Dict[int, int] = {}
+        self.failures = 0
+        self.elapsed = 0.0
+
+    def record(self, status: Optional[int], latency: float) -> None:
+        self.latencies.append(latency)
+        if status is None:
+            self.failures += 1
+        else:
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    @property
+    def errors(self) -> int:
+        return self.failures + sum(count for status, count in self.statuses.items() if status >= 400)
+
+    def summary(self) -> dict:
+        latencies = sorted(self.latencies)
+        return {
+            "requests": len(latencies),
+            "errors": self.errors,
+            "throughput": len(latencies) / self.elapsed if self.elapsed else 0.0,
+            "p50": percentile(latencies, 50),
+            "p90": percentile(latencies, 90),
+            "p99": percentile(latencies, 99),
+            "max": latencies[-1] if latencies else 0.0,
+        }
+
+async def run_scenario(name: str, send: Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]], client: httpx.AsyncClient, requests: int, concurrency: int) -> Result:
+    result = Result(name)
+    counter = iter(range(requests))
+
+    async def worker():
+        for index in counter:
+            started = time.perf_counter()
+            try:
+                response = await send(client, index)
+                status = response.status_code
+            except httpx.HTTPError as e:
+                print(f"❌ {name} #{index}: {str(e)}")
+                status = None
+            result.record(status, time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result.elapsed = time.perf_counter() - started
+    return result
+
+async def seed_design(client: httpx.AsyncClient) -> str:
+    """Create one design to edit and return its id"""
+    response = await client.post("/generate-image/", params={"prompt": "load test base design"})
+    response.raise_for_status()
+    match = IMAGE_ID_PATTERN.search(response.text)
+    if match is None:
+        raise RuntimeError("Could not find a design id in the /generate-image/ response")
+    return match.group(1)
+
+async def run(args: argparse.Namespace) -> List[Result]:
+    use_cache = "true" if args.use_cache else "false"
+    timeout = httpx.Timeout(args.timeout)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=timeout, limits=limits) as client:
+        senders = {
+            "generate-image": lambda client, i: client.post(
+                "/generate-image/", params={"prompt": f"load test image {i}", "size": args.size, "use_cache": use_cache}
+            ),
+            "search-designs": lambda client, i: client.post(
+                "/search-designs/", params={"event_type": "wedding", "theme": f"theme {i}", "use_cache": use_cache}
+            ),
+        }
+        if "edit-design" in args.scenarios:
+            design_id = await seed_design(client)
+            senders["edit-design"] = lambda client, i: client.post(
+                f"/edit-design/{design_id}", data={"effect": "vintage+contrast", "text_overlay": f"Load test {i}"}
+            )
+
+        results = []
+        for name in args.scenarios:
+            print(f"▶️ {name}: {args.requests} requests at concurrency {args.concurrency}")
+            results.append(await run_scenario(name, senders[name], client, args.requests, args.concurrency))
+        return results
+
+def report(results: List[Result]) -> None:
+    print()
+    print(f"{'endpoint':<16}{'reqs':>6}{'errors':>8}{'req/s':>9}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for result in results:
+        s = result.summary()
+        print(
+            f"{result.name:<16}{s['requests']:>6}{s['errors']:>8}{s['throughput']:>9.1f}"
+            f"{s['p50'] * 1000:>10.0f}{s['p90'] * 1000:>10.0f}{s['p99'] * 1000:>10.0f}{s['max'] * 1000:>10.0f}"
+        )
+        if result.errors:
+            print(f"{'':<16}statuses: {result.statuses}, transport failures: {result.failures}")
+
+def wait_until_ready(url: str, process: subprocess.Popen, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Process serving {url} exited with code {process.returncode}")
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Timed out waiting for {url}")
+
+def spawn(args: argparse.Namespace) -> List[subprocess.Popen]:
+    """Start the mock inference server and the app pointed at it"""
+    output = None if args.verbose else subprocess.DEVNULL
+    mock_url = f"http://127.0.0.1:{args.mock_port}"
+    mock = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "loadtest.mock_inference:app", "--port", str(args.mock_port), "--log-level", "warning"],
+        stdout=output, stderr=output,
+    )
+    wait_until_ready(f"{mock_url}/stats", mock)
+
+    env = dict(os.environ)
+    env["HUGGINGFACE_INFERENCE_URL"] = f"{mock_url}/models"
+    env.setdefault("HUGGINGFACE_API_KEY", "mock-key")
+    env.setdefault("HUGGINGFACE_TEXT_MODEL", "gpt2")
+    env.setdefault("HUGGINGFACE_IMAGE_MODEL", "stabilityai/stable-diffusion-2-1")
+    port = args.base_url.rsplit(":", 1)[-1].strip("/")
+    app = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "hello:app", "--port", port, "--log-level", "warning"],
+        stdout=output, stderr=output, env=env,
+    )
+    wait_until_ready(f"{args.base_url}/", app)
+    return [app, mock]
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test the photo agent endpoints")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated subset of " + ", ".join(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=50, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--size", default="512x512", help="image size for /generate-image/")
+    parser.add_argument("--timeout", type=float, default=180)
+    parser.add_argument("--use-cache", action="store_true", help="let generation caches answer repeat work")
+    parser.add_argument("--spawn", action="store_true", help="start the mock inference server and the app")
+    parser.add_argument("--mock-port", type=int, default=9000)
+    parser.add_argument("--verbose", action="store_true", help="show output of spawned processes")
+    args = parser.parse_args()
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    processes = spawn(args) if args.spawn else []
+    try:
+        report(asyncio.run(run(args)))
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+if __name__ == "__main__":
+    main()
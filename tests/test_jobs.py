@@ -0,0 +1,29 @@
+import os
+import tempfile
+import time
+import unittest
+
+from ai_agent.job_store import JobStore
+from ai_agent.jobs import job_events
+
+class JobEventsTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = JobStore(os.path.join(self.directory.name, "jobs.sqlite3"), stale_after=0.2)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    async def test_stale_job_ends_stream_with_failed(self):
+        job_id = self.store.create("generate-image", {})
+        events = []
+        started = time.monotonic()
+        # Nothing refreshes the job's heartbeat, as when its process has died
+        async for event in job_events(job_id, lambda job: {"status": job["status"]}, store=self.store, poll_interval=0.05, keepalive_interval=60):
+            events.append(event.split("\n", 1)[0])
+            if time.monotonic() - started > 5:
+                break
+        self.assertEqual(events, ["event: progress", "event: failed"])
+
+if __name__ == "__main__":
+    unittest.main()
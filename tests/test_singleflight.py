@@ -0,0 +1,41 @@
+import asyncio
+import unittest
+
+from ai_agent.singleflight import SingleFlight
+
+class SingleFlightTest(unittest.IsolatedAsyncioTestCase):
+    async def test_coalesces_concurrent_calls(self):
+        flight = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "done"
+
+        results = await asyncio.gather(*(flight.do("key", work) for _ in range(3)))
+        self.assertEqual(results, ["done"] * 3)
+        self.assertEqual(calls, 1)
+
+    async def test_caller_after_last_waiter_cancelled_starts_fresh_call(self):
+        flight = SingleFlight()
+        started = asyncio.Event()
+
+        async def work():
+            started.set()
+            await asyncio.sleep(0.05)
+            return "done"
+
+        first = asyncio.ensure_future(flight.do("key", work))
+        await started.wait()
+        first.cancel()
+        # Let the cancelled caller leave, but not the shared task finish dying
+        with self.assertRaises(asyncio.CancelledError):
+            await first
+
+        self.assertEqual(await flight.do("key", work), "done")
+        self.assertEqual(flight.stats()["coalesced"], 0)
+
+if __name__ == "__main__":
+    unittest.main()